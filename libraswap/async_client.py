@@ -0,0 +1,90 @@
+import time
+
+from grpc import aio
+
+from libraswap.client import (account_state_item, account_transaction_item,
+                              check_submit_response, decode_account_state,
+                              decode_account_state_view, transactions_item,
+                              transfer_request, verify_account_states,
+                              verify_account_transactions, verify_transactions)
+from libraswap.lib.admission_control_pb2_grpc import AdmissionControlStub
+from libraswap.lib.get_with_proof_pb2 import UpdateToLatestLedgerRequest
+
+
+class AsyncLibraClient:
+    def __init__(self, rpc_server, verifier=None):
+        self.rpc_server = rpc_server
+        self.verifier = verifier
+        self.last_version_seen = 0
+        self.channel = aio.insecure_channel(self.rpc_server)
+        self.stub = AdmissionControlStub(self.channel)
+
+    async def close(self):
+        await self.channel.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def update_to_latest_ledger(self, items):
+        request = UpdateToLatestLedgerRequest(
+            client_known_version=self.last_version_seen, requested_items=items
+        )
+        response = await self.stub.UpdateToLatestLedger(request)
+        assert len(response.response_items) == len(items)
+        if self.verifier is not None:
+            self.verifier.verify_update_to_latest_ledger(response)
+        # concurrent calls may complete out of order, never move backwards
+        self.last_version_seen = max(self.last_version_seen, response.ledger_info_with_sigs.ledger_info.version)
+        return response
+
+    async def get_latest_version_from_ledger(self):
+        response = await self.update_to_latest_ledger([])
+        return response.ledger_info_with_sigs.ledger_info.version
+
+    async def get_account_states(self, addrs):
+        response = await self.update_to_latest_ledger([account_state_item(addr) for addr in addrs])
+        return [
+            decode_account_state(addr, state)
+            for addr, state in zip(addrs, verify_account_states(addrs, response))
+        ]
+
+    async def get_account_state(self, addr):
+        return (await self.get_account_states([addr]))[0]
+
+    async def get_account_state_views(self, addrs):
+        response = await self.update_to_latest_ledger([account_state_item(addr) for addr in addrs])
+        return [
+            decode_account_state_view(addr, state)
+            for addr, state in zip(addrs, verify_account_states(addrs, response))
+        ]
+
+    async def get_account_transactions(self, queries):
+        """ queries: [(address, seq), ...] """
+        response = await self.update_to_latest_ledger([account_transaction_item(address, seq) for address, seq in queries])
+        root = response.ledger_info_with_sigs.ledger_info.transaction_accumulator_hash
+        return verify_account_transactions([
+            item.get_account_transaction_by_sequence_number_response for item in response.response_items
+        ], root)
+
+    async def get_account_transaction(self, address, seq, fetch_events=None):
+        return (await self.get_account_transactions([(address, seq)]))[0]
+
+    async def get_transactions(self, start_version, limit, fetch_events=True, accumulator=None):
+        response = await self.update_to_latest_ledger([transactions_item(start_version, limit, fetch_events)])
+        root = response.ledger_info_with_sigs.ledger_info.transaction_accumulator_hash
+        return verify_transactions(response.response_items[0].get_transactions_response, root, start_version, fetch_events, accumulator)
+
+    async def send_transaction(self, sender, recipient, amount, max_gas_amount=140000, gas_unit_price=0, expiration_time=None):
+        if expiration_time is None:
+            expiration_time = int(time.time()) + 10
+
+        account_state = await self.get_account_state(sender.address)
+        seq = account_state.sequence_number
+
+        # send raw transaction
+        request = transfer_request(sender, seq, recipient, amount, max_gas_amount, gas_unit_price, expiration_time)
+        response = await self.stub.SubmitTransaction(request)
+        return check_submit_response(response)
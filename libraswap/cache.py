@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+from libraswap.wallet.account_state import FrozenAccountResource
+
+
+def _key(address):
+    # hex addresses in any case share one entry, as raw bytes
+    return bytes.fromhex(address)
+
+
+class AccountStateCache:
+    """ LRU cache of account resources tagged with the ledger version they were proven at """
+
+    def __init__(self, max_entries=100000, max_staleness=0, max_age_seconds=1.0):
+        # entries are fixed-size frozen resources, so max_entries bounds the memory of the cache
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        # the latest version only moves when something reaches the node, so entries also expire with time,
+        # None keeps them until a LedgerFollower(cache=...) invalidates them
+        self.max_age_seconds = max_age_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, address, latest_version):
+        address = _key(address)
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return None
+            version, resource, fetched_at = entry
+            too_old = self.max_age_seconds is not None and time.monotonic() - fetched_at > self.max_age_seconds
+            if latest_version - version > self.max_staleness or too_old:
+                del self._entries[address]
+                return None
+            self._entries.move_to_end(address)
+        return resource.to_struct()
+
+    def put(self, address, version, resource):
+        address = _key(address)
+        with self._lock:
+            entry = self._entries.get(address)
+            # a slow response must not overwrite a newer state
+            if entry is not None and entry[0] > version:
+                return
+            self._entries[address] = (version, FrozenAccountResource.from_struct(resource), time.monotonic())
+            self._entries.move_to_end(address)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, address):
+        with self._lock:
+            self._entries.pop(_key(address), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
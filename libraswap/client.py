@@ -5,117 +5,328 @@ import grpc
 from libraswap.lib.admission_control_pb2 import (AdmissionControlStatusCode,
                                                  SubmitTransactionRequest)
 from libraswap.lib.admission_control_pb2_grpc import AdmissionControlStub
+from libraswap.lib.access_path_pb2 import AccessPath
 from libraswap.lib.get_with_proof_pb2 import (
     GetAccountStateRequest, GetAccountTransactionBySequenceNumberRequest,
-    RequestItem, UpdateToLatestLedgerRequest)
-from libraswap.transaction.transaction import (TRANSFER_OPCODE, RawTransaction,
-                                               Script, SignedTransaction,
-                                               TransactionArgument,
-                                               TransactionPayload)
-from libraswap.utils.hash import create_hasher, create_hasher_prefix
-from libraswap.utils.verify import (verify_events, verify_tx_hash,
-                                    verify_tx_proof)
-from libraswap.wallet.account_state import (ACCOUNT_STATE_PATH,
-                                            AccountResource, AccountState)
+    GetEventsByEventAccessPathRequest, GetTransactionsRequest, RequestItem,
+    UpdateToLatestLedgerRequest)
+from libraswap.lib.mempool_status_pb2 import MempoolAddTransactionStatusCode
+from libraswap.transaction.sequence import SequenceNumberManager
+from libraswap.transaction.template import TransferTemplate
+from libraswap.utils.verify import (verify_account_states_batch,
+                                    verify_events_for_versions,
+                                    verify_events_with_proof, verify_tx_list,
+                                    verify_txs_with_proof)
+from libraswap.wallet.account_state import (ACCOUNT_RECEIVED_EVENTS_PATH,
+                                            ACCOUNT_SENT_EVENTS_PATH,
+                                            AccountResourceView)
+
+TRANSFER_TEMPLATE = TransferTemplate()
+
+# StatusCode of the Libra VM when the sequence number does not match the account
+SEQUENCE_NUMBER_TOO_OLD = 3
+SEQUENCE_NUMBER_TOO_NEW = 4
+
+
+def account_state_item(addr):
+    account = GetAccountStateRequest(address=bytes.fromhex(addr))
+    return RequestItem(get_account_state_request=account)
+
+
+def account_transaction_item(address, seq):
+    tx_req = GetAccountTransactionBySequenceNumberRequest(account=bytes.fromhex(address), sequence_number=seq, fetch_events=True)
+    return RequestItem(get_account_transaction_by_sequence_number_request=tx_req)
+
+
+def transactions_item(start_version, limit, fetch_events):
+    tx_req = GetTransactionsRequest(start_version=start_version, limit=limit, fetch_events=fetch_events)
+    return RequestItem(get_transactions_request=tx_req)
+
+
+def events_item(address, path, start_seq, limit, ascending=True):
+    access_path = AccessPath(address=bytes.fromhex(address), path=bytes.fromhex(path))
+    events_req = GetEventsByEventAccessPathRequest(access_path=access_path, start_event_seq_num=start_seq, ascending=ascending, limit=limit)
+    return RequestItem(get_events_by_event_access_path_request=events_req)
+
+
+def decode_account_state(addr, state):
+    # only the AccountResource entry of the blob is deserialized
+    return decode_account_state_view(addr, state).to_resource()
+
+
+def decode_account_state_view(addr, state):
+    return AccountResourceView(state.account_state_with_proof.blob.blob, addr)
+
+
+def verify_account_states(addrs, response):
+    ledger_info = response.ledger_info_with_sigs.ledger_info
+    root = ledger_info.transaction_accumulator_hash
+    states = [item.get_account_state_response for item in response.response_items]
+    for state in states:
+        # a valid proof at an older version would pass an outdated balance or sequence number as the latest
+        assert state.account_state_with_proof.version == ledger_info.version
+    # accounts proven at the same version share the upper nodes of both the accumulator and the state tree
+    verify_account_states_batch([
+        (bytes.fromhex(addr), state.account_state_with_proof)
+        for addr, state in zip(addrs, states)
+    ], root)
+    return states
+
+
+def verify_account_transactions(tx_responses, root, engine=None):
+    txs_with_proof = [tx_response.signed_transaction_with_proof for tx_response in tx_responses]
+    # a VerificationEngine spreads the hashes and proofs of large responses over its workers
+    if engine is None:
+        verify_txs_with_proof(txs_with_proof, root)
+    else:
+        engine.verify_txs_with_proof(txs_with_proof, root)
+    return [(root, tx_with_proof.version, tx_with_proof.proof) for tx_with_proof in txs_with_proof]
+
+
+def verify_transactions(tx_response, root, start_version, fetch_events, accumulator=None, engine=None, store=None):
+    txn_list = tx_response.txn_list_with_proof
+    leaves = verify_tx_list(txn_list, root) if engine is None else engine.verify_tx_list(txn_list, root)
+
+    # [(version, signed_transaction, transaction_info, events), ...]
+    first_version = txn_list.first_transaction_version.value
+    if leaves:
+        # a valid range starting later would silently skip versions
+        assert first_version == start_version
+    events_for_versions = txn_list.events_for_versions.events_for_version
+    if fetch_events:
+        verify_events_for_versions(events_for_versions, txn_list.infos)
+    else:
+        assert len(events_for_versions) == 0
+    if accumulator is not None and leaves:
+        # the new root must extend the ledger we already follow
+        accumulator.verify_extension(first_version, txn_list.proof_of_first_transaction)
+    txs = [
+        (first_version + i, tx, info, list(events_for_versions[i].events) if fetch_events else [])
+        for i, (tx, info) in enumerate(zip(txn_list.transactions, txn_list.infos))
+    ]
+    # the store is written first, a follower resuming from the accumulator never skips versions missing from it
+    if store is not None:
+        store.put_transactions(txs)
+    if accumulator is not None and leaves:
+        accumulator.append(leaves)
+    return txs
+
+
+def verify_events_response(events_response, ledger_info, address, path, start_seq, limit, ascending):
+    root = ledger_info.transaction_accumulator_hash
+    events_with_proof = events_response.events_with_proof
+    verify_events_with_proof(events_with_proof, root)
+
+    # the account state at the ledger version holds the handle of the requested stream
+    latest = events_response.proof_of_latest_event
+    assert events_response.HasField('proof_of_latest_event')
+    assert latest.version == ledger_info.version
+    verify_account_states_batch([(bytes.fromhex(address), latest)], root)
+    resource = AccountResourceView(latest.blob.blob, address).freeze()
+    handle = {
+        ACCOUNT_SENT_EVENTS_PATH: resource.sent_events,
+        ACCOUNT_RECEIVED_EVENTS_PATH: resource.received_events
+    }[path.lower()]
+
+    # the node must not skip events of the stream, nor serve events of another stream
+    step = 1 if ascending else -1
+    for i, event_with_proof in enumerate(events_with_proof):
+        assert event_with_proof.event.key == handle.key
+        assert event_with_proof.event.sequence_number == start_seq + i * step
+    if ascending and len(events_with_proof) < limit:
+        # a short page must reach the end of the stream
+        assert start_seq + len(events_with_proof) == handle.count
+    return list(events_with_proof)
+
+
+def transfer_request(sender, seq, recipient, amount, max_gas_amount, gas_unit_price, expiration_time):
+    # create raw transaction
+    raw_txn = TRANSFER_TEMPLATE.raw_transaction(
+        bytes.fromhex(sender.address),
+        seq,
+        bytes.fromhex(recipient.address),
+        amount,
+        max_gas_amount,
+        gas_unit_price,
+        expiration_time
+    )
+
+    # sign raw transaction
+    signature = sender.sign_detached(TRANSFER_TEMPLATE.hash(raw_txn))
+    return signed_transfer_request(sender, raw_txn, signature)
+
+
+def signed_transfer_request(sender, raw_txn, signature):
+    request = SubmitTransactionRequest()
+    request.signed_txn.signed_txn = TRANSFER_TEMPLATE.signed_transaction(raw_txn, bytes.fromhex(sender.public_key), signature)
+    return request
+
+
+class TransactionRejected(Exception):
+    def __init__(self, response):
+        super().__init__('Transaction has been rejected by admission control')
+        self.response = response
+
+
+def check_submit_response(response):
+    # mempool and vm rejections leave ac_status unset, which reads as Accepted
+    if response.WhichOneof('status') != 'ac_status' or response.ac_status.code != AdmissionControlStatusCode.Accepted:
+        raise TransactionRejected(response)
+    return response
+
+
+def is_sequence_number_rejection(response):
+    status = response.WhichOneof('status')
+    if status == 'mempool_status':
+        return response.mempool_status.code == MempoolAddTransactionStatusCode.InvalidSeqNumber
+    if status == 'vm_status':
+        return response.vm_status.major_status in (SEQUENCE_NUMBER_TOO_OLD, SEQUENCE_NUMBER_TOO_NEW)
+    return False
 
 
 class LibraClient:
-    def __init__(self, rpc_server):
+    def __init__(self, rpc_server, track_sequence_numbers=False, cache=None, verifier=None, store=None, engine=None):
         self.rpc_server = rpc_server
+        self.verifier = verifier
+        self.store = store
+        self.engine = engine
         self.last_version_seen = 0
         self.stub = self._start_rpc_client_instance()
+        self.sequence_numbers = SequenceNumberManager(self) if track_sequence_numbers else None
+        self.cache = cache
 
     def _start_rpc_client_instance(self):
         channel = grpc.insecure_channel(self.rpc_server)
         return AdmissionControlStub(channel)
 
-    def get_latest_version_from_ledger(self):
+    def update_to_latest_ledger(self, items):
+        # all items are answered in one round trip, response_items keep the request order
         request = UpdateToLatestLedgerRequest(
-            client_known_version=self.last_version_seen, requested_items=[]
+            client_known_version=self.last_version_seen, requested_items=items
         )
         response = self.stub.UpdateToLatestLedger(request)
-        ledger_version = response.ledger_info_with_sigs.ledger_info.version
-        self.last_version_seen = ledger_version
-        return ledger_version
+        assert len(response.response_items) == len(items)
+        # without a verifier the endpoint is trusted to report the real root
+        if self.verifier is not None:
+            self.verifier.verify_update_to_latest_ledger(response)
+        # endpoints of a pool may be at different heights, never move backwards
+        self.last_version_seen = max(self.last_version_seen, response.ledger_info_with_sigs.ledger_info.version)
+        return response
 
-    def get_account_state(self, addr):
-        account = GetAccountStateRequest(address=bytes.fromhex(addr))
-        item = RequestItem(get_account_state_request=account)
-        request = UpdateToLatestLedgerRequest(
-            client_known_version=self.last_version_seen, requested_items=[item]
-        )
-        response = self.stub.UpdateToLatestLedger(request)
-        state = response.response_items[0].get_account_state_response
-        raw_data = state.account_state_with_proof.blob.blob
-        if len(raw_data) == 0:
-            return AccountResource.empty(addr)
-        else:
-            # account_state_map = {'path': <resource>, 'address': <address_length>}
-            account_state_map = AccountState.deserialize(raw_data).blob
-            account_resource = account_state_map[bytes.fromhex(ACCOUNT_STATE_PATH)]
-            return AccountResource.deserialize(bytes(account_resource))
+    def get_latest_version_from_ledger(self):
+        response = self.update_to_latest_ledger([])
+        return response.ledger_info_with_sigs.ledger_info.version
+
+    def _fetch_account_states(self, addrs):
+        response = self.update_to_latest_ledger([account_state_item(addr) for addr in addrs])
+        states = [
+            decode_account_state(addr, state)
+            for addr, state in zip(addrs, verify_account_states(addrs, response))
+        ]
+        if self.cache is not None:
+            version = response.ledger_info_with_sigs.ledger_info.version
+            for addr, state in zip(addrs, states):
+                self.cache.put(addr, version, state)
+        return states
+
+    def get_account_states(self, addrs, fresh=False):
+        if self.cache is None or fresh:
+            return self._fetch_account_states(addrs)
+
+        # only the accounts missing from the cache (or too stale) go to the ledger
+        states = [self.cache.get(addr, self.last_version_seen) for addr in addrs]
+        missing = [addr for addr, state in zip(addrs, states) if state is None]
+        if missing:
+            fetched = iter(self._fetch_account_states(missing))
+            states = [next(fetched) if state is None else state for state in states]
+        return states
+
+    def get_account_state(self, addr, fresh=False):
+        return self.get_account_states([addr], fresh)[0]
+
+    def get_account_state_views(self, addrs):
+        response = self.update_to_latest_ledger([account_state_item(addr) for addr in addrs])
+        return [
+            decode_account_state_view(addr, state)
+            for addr, state in zip(addrs, verify_account_states(addrs, response))
+        ]
+
+    def _fetch_account_transactions(self, queries):
+        response = self.update_to_latest_ledger([account_transaction_item(address, seq) for address, seq in queries])
+        root = response.ledger_info_with_sigs.ledger_info.transaction_accumulator_hash
+        tx_responses = [item.get_account_transaction_by_sequence_number_response for item in response.response_items]
+        results = verify_account_transactions(tx_responses, root, self.engine)
+        if self.store is not None:
+            self.store.put_account_transactions(
+                response.ledger_info_with_sigs,
+                [tx_response.signed_transaction_with_proof for tx_response in tx_responses]
+            )
+        return results
+
+    def get_account_transactions(self, queries):
+        """ queries: [(address, seq), ...] """
+        if self.store is None:
+            return self._fetch_account_transactions(queries)
+
+        # committed transactions never change, stored proofs are served without a round trip
+        results = [self.store.get_account_transaction_proof(address, seq) for address, seq in queries]
+        missing = [query for query, result in zip(queries, results) if result is None]
+        if missing:
+            fetched = iter(self._fetch_account_transactions(missing))
+            results = [next(fetched) if result is None else result for result in results]
+        return results
 
     def get_account_transaction(self, address, seq, fetch_events=None):
-        tx_req = GetAccountTransactionBySequenceNumberRequest(account=bytes.fromhex(address), sequence_number=seq, fetch_events=True)
-        item = RequestItem(get_account_transaction_by_sequence_number_request=tx_req)
-        request = UpdateToLatestLedgerRequest(
-            client_known_version=self.last_version_seen, requested_items=[item])
-        response = self.stub.UpdateToLatestLedger(request)
+        return self.get_account_transactions([(address, seq)])[0]
 
-        tx_with_proof = response.response_items[0].get_account_transaction_by_sequence_number_response.signed_transaction_with_proof
+    def get_transactions(self, start_version, limit, fetch_events=True, accumulator=None):
+        response = self.update_to_latest_ledger([transactions_item(start_version, limit, fetch_events)])
         root = response.ledger_info_with_sigs.ledger_info.transaction_accumulator_hash
+        txs = verify_transactions(
+            response.response_items[0].get_transactions_response, root, start_version, fetch_events, accumulator, self.engine, self.store
+        )
+        if self.store is not None:
+            self.store.put_ledger_info(response.ledger_info_with_sigs)
+        return txs
+
+    def get_events(self, address, path, start_seq, limit, ascending=True):
+        response = self.update_to_latest_ledger([events_item(address, path, start_seq, limit, ascending)])
+        return verify_events_response(
+            response.response_items[0].get_events_by_event_access_path_response,
+            response.ledger_info_with_sigs.ledger_info, address, path, start_seq, limit, ascending
+        )
 
-        tx_version = tx_with_proof.version
-        tx_info = tx_with_proof.proof.transaction_info
-        tx_hash = tx_info.signed_transaction_hash
-        tx = tx_with_proof.signed_transaction
-        proof = tx_with_proof.proof.ledger_info_to_transaction_info_proof
+    def get_sent_events(self, address, start_seq, limit):
+        return self.get_events(address, ACCOUNT_SENT_EVENTS_PATH, start_seq, limit)
 
-        verify_events(tx_with_proof.events.events)
-        verify_tx_hash(tx, tx_hash)
-        verify_tx_proof(tx_info, tx_version, proof, root)
-        return root, tx_version, tx_with_proof.proof
+    def get_received_events(self, address, start_seq, limit):
+        return self.get_events(address, ACCOUNT_RECEIVED_EVENTS_PATH, start_seq, limit)
 
     def send_transaction(self, sender, recipient, amount, max_gas_amount=140000, gas_unit_price=0, expiration_time=None):
         if expiration_time is None:
             expiration_time = int(time.time()) + 10
 
-        account_state = self.get_account_state(sender.address)
-        seq = account_state.sequence_number
-
-        # create raw transaction
-        script = Script(
-            list(bytes.fromhex(TRANSFER_OPCODE)),
-            [
-                TransactionArgument('Address', list(bytes.fromhex(recipient.address))),
-                TransactionArgument('U64', amount)
-            ]
-        )
-        tx = RawTransaction(
-            list(bytes.fromhex(sender.address)),
-            seq,
-            TransactionPayload('Script', script),
-            max_gas_amount,
-            gas_unit_price,
-            expiration_time
-        )
+        if self.sequence_numbers is None:
+            account_state = self.get_account_state(sender.address, fresh=True)
+            seq = account_state.sequence_number
+        else:
+            seq = self.sequence_numbers.next(sender.address)
 
-        m = create_hasher()
-        m.update(create_hasher_prefix(b'RawTransaction'))
-        m.update(tx.serialize())
-        raw_tx_hash = m.digest()
+        # send raw transaction
+        request = transfer_request(sender, seq, recipient, amount, max_gas_amount, gas_unit_price, expiration_time)
+        # an RpcError leaves the numbers alone, the transaction may still have reached the mempool
+        response = self._submit_transaction(request, sender)
+        try:
+            return check_submit_response(response)
+        except TransactionRejected:
+            if self.sequence_numbers is not None:
+                # a definite rejection releases seq, numbers below it may be held by transactions still in the mempool
+                self.sequence_numbers.resync(sender.address, seq)
+            raise
 
-        # sign raw transaction
-        signed_txn = SignedTransaction(
-            tx,
-            list(bytes.fromhex(sender.public_key)),
-            list(sender.sign(raw_tx_hash)[:64])
-        )
+    def submit_transaction(self, request, sender):
+        """ submits a signed request as is, its sequence number is up to the caller, sender picks the endpoint of a pool """
+        return check_submit_response(self._submit_transaction(request, sender))
 
-        # send raw transaction
-        request = SubmitTransactionRequest()
-        request.signed_txn.signed_txn = signed_txn.serialize()
-        response = self.stub.SubmitTransaction(request)
-        if response.ac_status.code != AdmissionControlStatusCode.Accepted:
-            raise Exception('Transaction has been rejected by admission control')
-        return response
+    def _submit_transaction(self, request, sender):
+        return self.stub.SubmitTransaction(request)
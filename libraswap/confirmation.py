@@ -0,0 +1,177 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+import grpc
+
+from libraswap.client import (account_state_item, account_transaction_item,
+                              decode_account_state_view,
+                              verify_account_states)
+from libraswap.transaction.transaction import sender_and_sequence_number
+from libraswap.utils.verify import (event_accumulator_root,
+                                    hash_signed_transaction, verify_tx_hash,
+                                    verify_tx_proofs_batch)
+
+Confirmation = namedtuple('Confirmation', ['address', 'sequence_number', 'version', 'major_status'])
+
+
+class TransactionExpired(Exception):
+    def __init__(self, address, sequence_number):
+        super().__init__(f'Transaction {sequence_number} of {address} has expired')
+        self.address = address
+        self.sequence_number = sequence_number
+
+
+class TransactionReplaced(Exception):
+    def __init__(self, address, sequence_number, version):
+        super().__init__(f'Another transaction {sequence_number} of {address} has been committed at version {version}')
+        self.address = address
+        self.sequence_number = sequence_number
+        self.version = version
+
+
+def verify_committed_transaction(address, sequence_number, tx_with_proof):
+    # any committed transaction, failed ones without events included, is confirmed by its hash and proof
+    info = tx_with_proof.proof.transaction_info
+    verify_tx_hash(tx_with_proof.signed_transaction, info.signed_transaction_hash)
+    sender, committed_sequence_number = sender_and_sequence_number(tx_with_proof.signed_transaction.signed_txn)
+    assert (sender, committed_sequence_number) == (bytes.fromhex(address), sequence_number)
+    assert event_accumulator_root(tx_with_proof.events.events) == info.event_root_hash
+
+
+class ConfirmationTracker:
+    """ futures resolved with a Confirmation once a (sender, sequence_number) is committed """
+
+    def __init__(self, client, poll_interval=0.5, batch_size=100):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        # (address, sequence_number) -> (future, expiration_time, signed_transaction_hash)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def track(self, address, sequence_number, expiration_time=None, signed_txn=None):
+        """ signed_txn: the submitted bytes, a different transaction committed under the same number fails the future """
+        key = (bytes.fromhex(address).hex(), sequence_number)
+        signed_transaction_hash = None if signed_txn is None else hash_signed_transaction(signed_txn)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = (Future(), expiration_time, signed_transaction_hash)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return entry[0]
+
+    def _pop(self, key):
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def _resolve(self, key, version, info):
+        entry = self._pop(key)
+        if entry is None:
+            return
+        future, _, signed_transaction_hash = entry
+        if signed_transaction_hash is not None and signed_transaction_hash != info.signed_transaction_hash:
+            future.set_exception(TransactionReplaced(key[0], key[1], version))
+        else:
+            future.set_result(Confirmation(key[0], key[1], version, info.major_status))
+
+    def _fail(self, key, exception):
+        entry = self._pop(key)
+        if entry is not None:
+            entry[0].set_exception(exception)
+
+    def observe(self, txs):
+        """ txs: [(version, signed_transaction, transaction_info, events), ...] from LedgerFollower or get_transactions """
+        for version, signed_transaction, info, _ in txs:
+            sender, sequence_number = sender_and_sequence_number(signed_transaction.signed_txn)
+            self._resolve((sender.hex(), sequence_number), version, info)
+
+    def _confirm(self, committed):
+        response = self.client.update_to_latest_ledger([account_transaction_item(address, seq) for address, seq in committed])
+        proven = []
+        for key, item in zip(committed, response.response_items):
+            tx_response = item.get_account_transaction_by_sequence_number_response
+            if not tx_response.HasField('signed_transaction_with_proof'):
+                # answered by an endpoint behind the one that reported the commit, ask again on the next poll
+                continue
+            tx_with_proof = tx_response.signed_transaction_with_proof
+            try:
+                verify_committed_transaction(key[0], key[1], tx_with_proof)
+            except AssertionError as e:
+                # one transaction failing verification must not hold back the others
+                self._fail(key, e)
+                continue
+            proven.append((key, tx_with_proof))
+        if not proven:
+            return
+
+        verify_tx_proofs_batch([
+            (tx_with_proof.proof.transaction_info, tx_with_proof.version, tx_with_proof.proof.ledger_info_to_transaction_info_proof)
+            for _, tx_with_proof in proven
+        ], response.ledger_info_with_sigs.ledger_info.transaction_accumulator_hash)
+        # a later challenge can build on the stored proofs without the node
+        if self.client.store is not None:
+            self.client.store.put_account_transactions(response.ledger_info_with_sigs, [tx_with_proof for _, tx_with_proof in proven])
+        for key, tx_with_proof in proven:
+            self._resolve(key, tx_with_proof.version, tx_with_proof.proof.transaction_info)
+
+    def _poll_chunk(self, chunk, by_address, pending):
+        response = self.client.update_to_latest_ledger([account_state_item(address) for address in chunk])
+        states = verify_account_states(chunk, response)
+        timestamp_usecs = response.ledger_info_with_sigs.ledger_info.timestamp_usecs
+
+        committed = []
+        for address, state in zip(chunk, states):
+            next_sequence_number = decode_account_state_view(address, state).sequence_number
+            for sequence_number in by_address[address]:
+                key = (address, sequence_number)
+                expiration_time = pending[key][1]
+                if sequence_number < next_sequence_number:
+                    committed.append(key)
+                elif expiration_time is not None and timestamp_usecs > expiration_time * 1000000:
+                    # the ledger has moved past the expiration time, the transaction can never be committed
+                    self._fail(key, TransactionExpired(address, sequence_number))
+        if committed:
+            self._confirm(committed)
+
+    def poll(self):
+        with self._lock:
+            pending = dict(self._pending)
+        by_address = {}
+        for address, sequence_number in pending:
+            by_address.setdefault(address, []).append(sequence_number)
+        addresses = sorted(by_address)
+
+        # one verified round trip covers batch_size senders
+        for i in range(0, len(addresses), self.batch_size):
+            chunk = addresses[i:i + self.batch_size]
+            try:
+                self._poll_chunk(chunk, by_address, pending)
+            except grpc.RpcError:
+                # the node may come back, these senders are polled again
+                continue
+            except Exception as e:
+                # a response failing verification only fails the transactions it was about
+                for address in chunk:
+                    for sequence_number in by_address[address]:
+                        self._fail((address, sequence_number), e)
+
+    def _run(self):
+        while not self._closed.wait(self.poll_interval):
+            if self._pending:
+                self.poll()
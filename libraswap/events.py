@@ -0,0 +1,30 @@
+from libraswap.transaction.event import PaymentEvent
+from libraswap.wallet.account_state import ACCOUNT_RECEIVED_EVENTS_PATH
+
+
+class EventReader:
+    def __init__(self, client, address, path=ACCOUNT_RECEIVED_EVENTS_PATH, next_seq=0, page_size=100):
+        self.client = client
+        self.address = address
+        self.path = path
+        # events before next_seq have been consumed, persist it to resume the stream
+        self.next_seq = next_seq
+        self.page_size = page_size
+
+    def poll(self):
+        # one small request answers "anything new?", it is empty until the event count moves
+        events = self.client.get_events(self.address, self.path, self.next_seq, self.page_size)
+        if events:
+            self.next_seq = events[-1].event.sequence_number + 1
+        return events
+
+    def poll_all(self):
+        events = []
+        while True:
+            page = self.poll()
+            events.extend(page)
+            if len(page) < self.page_size:
+                return events
+
+    def poll_payments(self):
+        return [(e.transaction_version, PaymentEvent.decode_event(e.event)) for e in self.poll_all()]
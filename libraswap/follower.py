@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+
+from libraswap.transaction.transaction import touched_addresses
+
+
+class LedgerFollower:
+    """ for tx in LedgerFollower(LibraClient(...)) or async for tx in LedgerFollower(AsyncLibraClient(...)) """
+
+    def __init__(self, client, start_version=0, cursor_path=None, fetch_events=True,
+                 min_batch=16, max_batch=1000, poll_interval=1.0, cache=None, accumulator=None):
+        self.client = client
+        self.cache = cache
+        # an accumulator frontier must cover exactly the versions before start_version
+        self.accumulator = accumulator
+        self.cursor_path = cursor_path
+        self.fetch_events = fetch_events
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.batch_size = min_batch
+        self.next_version = self._load_cursor(start_version)
+
+    def _load_cursor(self, default):
+        if self.cursor_path is None or not os.path.exists(self.cursor_path):
+            return default
+        with open(self.cursor_path, 'r') as f:
+            return int(f.read())
+
+    def save_cursor(self):
+        if self.cursor_path is None:
+            return
+        tmp_path = f'{self.cursor_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(self.next_version))
+        os.replace(tmp_path, self.cursor_path)
+
+    def _adapt_batch_size(self, fetched):
+        # grow while there is a backlog to catch up on, shrink once we are at the head of the ledger
+        if fetched == self.batch_size:
+            self.batch_size = min(self.batch_size * 2, self.max_batch)
+        else:
+            self.batch_size = max(self.batch_size // 2, self.min_batch)
+
+    def _on_batch(self, txs):
+        # a gap must fail loudly rather than move the cursor past the missing versions
+        assert len(txs) == 0 or txs[0][0] == self.next_version
+        self._adapt_batch_size(len(txs))
+        # cached states of accounts touched by new transactions are outdated
+        if self.cache is not None:
+            for _, tx, _, _ in txs:
+                for address in touched_addresses(tx.signed_txn):
+                    self.cache.invalidate(address)
+        return txs
+
+    # batches are only fetched when the consumer asks for more, a slow consumer holds back the follower
+    def __iter__(self):
+        try:
+            while True:
+                txs = self._on_batch(self.client.get_transactions(self.next_version, self.batch_size, self.fetch_events, self.accumulator))
+                if not txs:
+                    time.sleep(self.poll_interval)
+                    continue
+                for tx in txs:
+                    yield tx
+                    self.next_version = tx[0] + 1
+                self.save_cursor()
+        finally:
+            self.save_cursor()
+
+    async def __aiter__(self):
+        try:
+            while True:
+                txs = self._on_batch(await self.client.get_transactions(self.next_version, self.batch_size, self.fetch_events, self.accumulator))
+                if not txs:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                for tx in txs:
+                    yield tx
+                    self.next_version = tx[0] + 1
+                self.save_cursor()
+        finally:
+            self.save_cursor()
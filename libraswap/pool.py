@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+
+import grpc
+
+from libraswap.client import LibraClient
+from libraswap.lib.admission_control_pb2_grpc import AdmissionControlStub
+
+ROUND_ROBIN = 'round_robin'
+LEAST_OUTSTANDING = 'least_outstanding'
+
+
+class Endpoint:
+    def __init__(self, rpc_server, channels):
+        self.rpc_server = rpc_server
+        # a local subchannel pool gives every channel its own HTTP/2 connection
+        self.stubs = [
+            AdmissionControlStub(grpc.insecure_channel(rpc_server, options=[('grpc.use_local_subchannel_pool', 1)]))
+            for _ in range(channels)
+        ]
+        self._stub_cycle = itertools.cycle(self.stubs)
+        self.outstanding = 0
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.ejected_until = 0.0
+
+    def next_stub(self):
+        return next(self._stub_cycle)
+
+    def is_healthy(self, now):
+        return self.ejected_until <= now
+
+
+class ChannelPool:
+    def __init__(self, rpc_servers, channels_per_endpoint=2, strategy=ROUND_ROBIN,
+                 max_latency=1.0, max_error_rate=0.5, eject_seconds=30, decay=0.2):
+        if strategy not in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError(f'unknown strategy: {strategy}')
+        self.endpoints = [Endpoint(rpc_server, channels_per_endpoint) for rpc_server in rpc_servers]
+        self.strategy = strategy
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.eject_seconds = eject_seconds
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+
+    def _healthy_endpoints(self):
+        now = time.monotonic()
+        healthy = [e for e in self.endpoints if e.is_healthy(now)]
+        # fail open rather than refusing every request when all endpoints are ejected
+        return healthy or self.endpoints
+
+    def _pick_read_endpoint(self, exclude):
+        candidates = [e for e in self._healthy_endpoints() if e not in exclude] or self._healthy_endpoints()
+        if self.strategy == LEAST_OUTSTANDING:
+            return min(candidates, key=lambda e: e.outstanding)
+        return candidates[next(self._rr) % len(candidates)]
+
+    def endpoint_index_for(self, sender_address):
+        """ index in endpoints of the endpoint SubmitTransaction currently uses for sender_address """
+        # a sender always maps to the same endpoint so its sequence numbers reach one mempool in order
+        now = time.monotonic()
+        start = int(sender_address, 16) % len(self.endpoints)
+        for i in range(len(self.endpoints)):
+            index = (start + i) % len(self.endpoints)
+            if self.endpoints[index].is_healthy(now):
+                return index
+        return start
+
+    def _pick_sender_endpoint(self, sender_address):
+        return self.endpoints[self.endpoint_index_for(sender_address)]
+
+    def _call(self, endpoint, method, request):
+        with self._lock:
+            endpoint.outstanding += 1
+        start = time.monotonic()
+        failed = True
+        try:
+            response = getattr(endpoint.next_stub(), method)(request)
+            failed = False
+            return response
+        finally:
+            self._record(endpoint, time.monotonic() - start, failed)
+
+    def _record(self, endpoint, elapsed, failed):
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.latency += self.decay * (elapsed - endpoint.latency)
+            endpoint.error_rate += self.decay * ((1.0 if failed else 0.0) - endpoint.error_rate)
+            if endpoint.latency > self.max_latency or endpoint.error_rate > self.max_error_rate:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                endpoint.latency = 0.0
+                endpoint.error_rate = 0.0
+
+    def UpdateToLatestLedger(self, request):
+        # reads are idempotent, so a failed call is retried on another endpoint
+        tried = []
+        while True:
+            endpoint = self._pick_read_endpoint(tried)
+            tried.append(endpoint)
+            try:
+                return self._call(endpoint, 'UpdateToLatestLedger', request)
+            except grpc.RpcError:
+                if len(tried) >= len(self.endpoints):
+                    raise
+
+    def SubmitTransaction(self, request, sender_address=None):
+        if sender_address is None:
+            endpoint = self._pick_read_endpoint([])
+        else:
+            endpoint = self._pick_sender_endpoint(sender_address)
+        return self._call(endpoint, 'SubmitTransaction', request)
+
+
+class PooledLibraClient(LibraClient):
+    def __init__(self, rpc_servers, track_sequence_numbers=False, cache=None, verifier=None, store=None, engine=None, **pool_options):
+        self.pool_options = pool_options
+        super().__init__(rpc_servers, track_sequence_numbers, cache, verifier, store, engine)
+
+    def _start_rpc_client_instance(self):
+        return ChannelPool(self.rpc_server, **self.pool_options)
+
+    def _submit_transaction(self, request, sender):
+        return self.stub.SubmitTransaction(request, sender.address)
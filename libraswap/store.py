@@ -0,0 +1,226 @@
+import sqlite3
+import threading
+from collections import namedtuple
+
+from libraswap.lib.events_pb2 import EventsList
+from libraswap.lib.ledger_info_pb2 import LedgerInfoWithSignatures
+from libraswap.lib.proof_pb2 import SignedTransactionProof
+from libraswap.lib.transaction_info_pb2 import TransactionInfo
+from libraswap.lib.transaction_pb2 import SignedTransaction
+from libraswap.transaction.template import TransferTemplate
+from libraswap.transaction.transaction import sender_and_sequence_number
+
+# StatusCode::EXECUTED of the Libra VM
+EXECUTED = 4001
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ledger_infos (
+    version INTEGER PRIMARY KEY,
+    transaction_accumulator_hash BLOB NOT NULL,
+    ledger_info_with_sigs BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    version INTEGER PRIMARY KEY,
+    sender BLOB NOT NULL,
+    sequence_number INTEGER NOT NULL,
+    signed_transaction BLOB NOT NULL,
+    transaction_info BLOB NOT NULL,
+    events BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_sender ON transactions (sender, sequence_number);
+CREATE TABLE IF NOT EXISTS transaction_proofs (
+    version INTEGER PRIMARY KEY,
+    ledger_version INTEGER NOT NULL,
+    proof BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    version INTEGER PRIMARY KEY,
+    sender BLOB NOT NULL,
+    sequence_number INTEGER NOT NULL,
+    recipient BLOB NOT NULL,
+    amount INTEGER NOT NULL,
+    expiration_time INTEGER NOT NULL,
+    major_status INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transfers_by_sender ON transfers (sender, recipient, version);
+CREATE INDEX IF NOT EXISTS transfers_by_recipient ON transfers (recipient, version);
+'''
+
+Transfer = namedtuple('Transfer', ['version', 'sender', 'sequence_number', 'recipient', 'amount', 'expiration_time'])
+
+
+class LedgerStore:
+    """ verified ledger infos, transactions and their proofs in a local SQLite file """
+
+    def __init__(self, path, nodes=None, template=None):
+        self.path = path
+        # transfers made from this template are indexed by sender, recipient and amount
+        self.template = TransferTemplate() if template is None else template
+        # an AccumulatorNodeFile to build proofs for transactions fetched without one
+        self.nodes = nodes
+        # one connection shared by all threads, writes are serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def put_ledger_info(self, ledger_info_with_sigs):
+        ledger_info = ledger_info_with_sigs.ledger_info
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO ledger_infos VALUES (?, ?, ?)',
+                (ledger_info.version, ledger_info.transaction_accumulator_hash, ledger_info_with_sigs.SerializeToString())
+            )
+
+    def get_ledger_info(self, version=None):
+        """ the ledger info at version, or the latest one stored """
+        with self._lock:
+            if version is None:
+                row = self._conn.execute('SELECT ledger_info_with_sigs FROM ledger_infos ORDER BY version DESC LIMIT 1').fetchone()
+            else:
+                row = self._conn.execute('SELECT ledger_info_with_sigs FROM ledger_infos WHERE version = ?', (version,)).fetchone()
+        return None if row is None else LedgerInfoWithSignatures.FromString(row[0])
+
+    def _latest_ledger_info_before(self, num_leaves):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT version, transaction_accumulator_hash FROM ledger_infos WHERE version < ? ORDER BY version DESC LIMIT 1',
+                (num_leaves,)
+            ).fetchone()
+
+    def put_transactions(self, txs):
+        """ txs: [(version, signed_transaction, transaction_info, events), ...] as returned by get_transactions """
+        rows = []
+        transfers = []
+        for version, signed_transaction, info, events in txs:
+            sender, sequence_number = sender_and_sequence_number(signed_transaction.signed_txn)
+            rows.append((
+                version,
+                sender,
+                sequence_number,
+                signed_transaction.signed_txn,
+                info.SerializeToString(),
+                EventsList(events=events).SerializeToString()
+            ))
+            transfer = self.template.parse(signed_transaction.signed_txn)
+            if transfer is not None:
+                sender, sequence_number, recipient, amount, expiration_time = transfer
+                transfers.append((version, sender, sequence_number, recipient, amount, expiration_time, info.major_status))
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._conn.executemany('INSERT OR IGNORE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?)', transfers)
+
+    def put_account_transactions(self, ledger_info_with_sigs, txs_with_proof):
+        """ txs_with_proof: [SignedTransactionWithProof, ...] proven against ledger_info_with_sigs """
+        self.put_ledger_info(ledger_info_with_sigs)
+        self.put_transactions([
+            (tx.version, tx.signed_transaction, tx.proof.transaction_info, tx.events.events)
+            for tx in txs_with_proof
+        ])
+        ledger_version = ledger_info_with_sigs.ledger_info.version
+        with self._lock, self._conn:
+            # a proof against an older root is as good as one against a newer root, keep the first
+            self._conn.executemany('INSERT OR IGNORE INTO transaction_proofs VALUES (?, ?, ?)', [
+                (tx.version, ledger_version, tx.proof.SerializeToString()) for tx in txs_with_proof
+            ])
+
+    @staticmethod
+    def _decode_transaction(row):
+        version, signed_transaction, info, events = row
+        return (
+            version,
+            SignedTransaction(signed_txn=signed_transaction),
+            TransactionInfo.FromString(info),
+            list(EventsList.FromString(events).events)
+        )
+
+    def get_transaction(self, version):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version, signed_transaction, transaction_info, events FROM transactions WHERE version = ?',
+                (version,)
+            ).fetchone()
+        return None if row is None else self._decode_transaction(row)
+
+    def get_transactions(self, start_version, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT version, signed_transaction, transaction_info, events FROM transactions WHERE version >= ? ORDER BY version LIMIT ?',
+                (start_version, limit)
+            ).fetchall()
+        return [self._decode_transaction(row) for row in rows]
+
+    def get_account_transaction(self, address, seq):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version, signed_transaction, transaction_info, events FROM transactions WHERE sender = ? AND sequence_number = ?',
+                (bytes.fromhex(address), seq)
+            ).fetchone()
+        return None if row is None else self._decode_transaction(row)
+
+    def get_account_transaction_proof(self, address, seq):
+        """ (root, version, proof) like LibraClient.get_account_transaction, or None if no proof is stored """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT l.transaction_accumulator_hash, t.version, p.proof, t.transaction_info FROM transactions t '
+                'LEFT JOIN transaction_proofs p ON p.version = t.version '
+                'LEFT JOIN ledger_infos l ON l.version = p.ledger_version '
+                'WHERE t.sender = ? AND t.sequence_number = ?',
+                (bytes.fromhex(address), seq)
+            ).fetchone()
+        if row is None:
+            return None
+        root, version, proof, info = row
+        if proof is not None:
+            return root, version, SignedTransactionProof.FromString(proof)
+
+        # followed transactions come without a proof of their own, the node file can build one
+        if self.nodes is None or version >= self.nodes.num_leaves:
+            return None
+        ledger_info = self._latest_ledger_info_before(self.nodes.num_leaves)
+        if ledger_info is None or ledger_info[0] < version:
+            return None
+        ledger_version, root = ledger_info
+        return root, version, SignedTransactionProof(
+            ledger_info_to_transaction_info_proof=self.nodes.proof(version, ledger_version + 1),
+            transaction_info=TransactionInfo.FromString(info)
+        )
+
+    def find_transfers(self, sender=None, recipient=None, amount=None, since_version=0, executed_only=True, limit=None):
+        """ transfers of the stored transactions, oldest first, addresses are hex """
+        conditions = ['version >= ?']
+        params = [since_version]
+        if sender is not None:
+            conditions.append('sender = ?')
+            params.append(bytes.fromhex(sender))
+        if recipient is not None:
+            conditions.append('recipient = ?')
+            params.append(bytes.fromhex(recipient))
+        if amount is not None:
+            conditions.append('amount = ?')
+            params.append(amount)
+        if executed_only:
+            conditions.append('major_status = ?')
+            params.append(EXECUTED)
+        query = 'SELECT version, sender, sequence_number, recipient, amount, expiration_time FROM transfers WHERE {} ORDER BY version'.format(' AND '.join(conditions))
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            Transfer(version, sender.hex(), sequence_number, recipient.hex(), amount, expiration_time)
+            for version, sender, sequence_number, recipient, amount, expiration_time in rows
+        ]
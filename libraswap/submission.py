@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+
+from libraswap.client import (TRANSFER_TEMPLATE, TransactionRejected,
+                              is_sequence_number_rejection,
+                              signed_transfer_request)
+from libraswap.lib.admission_control_pb2 import AdmissionControlStatusCode
+from libraswap.lib.mempool_status_pb2 import MempoolAddTransactionStatusCode
+from libraswap.transaction.sequence import SequenceNumberManager
+from libraswap.transaction.transaction import ED25519_SIGNATURE_LENGTH
+from libraswap.wallet.signer import BatchSigner
+
+RETRY = 'retry'
+BACKOFF = 'backoff'
+RESYNC = 'resync'
+DROP = 'drop'
+
+# recipient is a hex address
+TransferOrder = namedtuple('TransferOrder', ['sender', 'recipient', 'amount', 'max_gas_amount', 'gas_unit_price'])
+TransferOrder.__new__.__defaults__ = (140000, 0)
+
+SubmissionResult = namedtuple('SubmissionResult', ['order', 'sequence_number', 'accepted', 'attempts', 'response', 'error'])
+
+
+def classify_response(response):
+    """ None for an accepted transaction, otherwise what to do about it """
+    status = response.WhichOneof('status')
+    if status == 'ac_status':
+        return None if response.ac_status.code == AdmissionControlStatusCode.Accepted else DROP
+    if is_sequence_number_rejection(response):
+        return RESYNC
+    if status == 'mempool_status' and response.mempool_status.code in (
+            MempoolAddTransactionStatusCode.MempoolIsFull, MempoolAddTransactionStatusCode.TooManyTransactions):
+        return BACKOFF
+    # InsufficientBalance, InvalidUpdate and the other VM statuses
+    return DROP
+
+
+def classify_rpc_error(error):
+    code = error.code()
+    if code == grpc.StatusCode.RESOURCE_EXHAUSTED:
+        return BACKOFF
+    if code in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED):
+        return RETRY
+    return DROP
+
+
+class SubmissionEngine:
+    """ signs and submits many transfers with a bounded number of SubmitTransaction calls in flight """
+
+    def __init__(self, client, max_in_flight=16, max_attempts=5, backoff=0.5, max_backoff=10.0,
+                 expiration_seconds=60, signer=None):
+        self.client = client
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.expiration_seconds = expiration_seconds
+        self.sequence_numbers = client.sequence_numbers or SequenceNumberManager(client)
+        self._own_signer = signer is None
+        self.signer = BatchSigner() if signer is None else signer
+        # a PooledLibraClient pins every sender to one endpoint, every endpoint gets max_in_flight calls
+        self._endpoints = len(getattr(client.stub, 'endpoints', [client.stub]))
+        self._in_flight = [threading.BoundedSemaphore(max_in_flight) for _ in range(self._endpoints)]
+        self.executor = ThreadPoolExecutor(max_in_flight * self._endpoints)
+
+    def close(self):
+        self.executor.shutdown()
+        if self._own_signer:
+            self.signer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _raw_transaction(self, order, seq):
+        return TRANSFER_TEMPLATE.raw_transaction(
+            bytes.fromhex(order.sender.address),
+            seq,
+            bytes.fromhex(order.recipient),
+            order.amount,
+            order.max_gas_amount,
+            order.gas_unit_price,
+            int(time.time()) + self.expiration_seconds
+        )
+
+    def _build_requests(self, orders):
+        # numbers are taken in queue order, so every sender's transfers are submitted without gaps
+        seqs = [self.sequence_numbers.next(order.sender.address) for order in orders]
+        raw_txns = [self._raw_transaction(order, seq) for order, seq in zip(orders, seqs)]
+        signatures = self.signer.sign(
+            (order.sender, TRANSFER_TEMPLATE.hash(raw_txn)) for order, raw_txn in zip(orders, raw_txns)
+        )
+        requests = [
+            signed_transfer_request(
+                order.sender,
+                raw_txn,
+                bytes(signatures[i * ED25519_SIGNATURE_LENGTH:(i + 1) * ED25519_SIGNATURE_LENGTH])
+            )
+            for i, (order, raw_txn) in enumerate(zip(orders, raw_txns))
+        ]
+        return seqs, requests
+
+    def _resign(self, order):
+        seq = self.sequence_numbers.next(order.sender.address)
+        raw_txn = self._raw_transaction(order, seq)
+        return seq, signed_transfer_request(order.sender, raw_txn, order.sender.sign_detached(TRANSFER_TEMPLATE.hash(raw_txn)))
+
+    def _in_flight_for(self, address):
+        # the limit follows a sender when the pool fails it over to the next healthy endpoint
+        stub = self.client.stub
+        return self._in_flight[stub.endpoint_index_for(address) if hasattr(stub, 'endpoint_index_for') else 0]
+
+    def _release(self, address, seq):
+        # seq never reached a mempool, numbers below it may still be waiting in one
+        try:
+            self.sequence_numbers.resync(address, seq)
+        except grpc.RpcError:
+            self.sequence_numbers.reset(address)
+
+    def _submit(self, order, seq, request):
+        address = order.sender.address
+        attempts = 0
+        maybe_submitted = False
+        while True:
+            attempts += 1
+            response = error = None
+            try:
+                with self._in_flight_for(address):
+                    response = self.client.submit_transaction(request, order.sender)
+                decision = None
+            except TransactionRejected as e:
+                response = e.response
+                decision = classify_response(response)
+            except grpc.RpcError as e:
+                error = e
+                decision = classify_rpc_error(e)
+                # a failed call may still have reached the mempool
+                maybe_submitted = True
+
+            if decision is None:
+                return SubmissionResult(order, seq, True, attempts, response, None)
+            # resigning a transfer that may already be in the mempool under a new number could pay it twice
+            if decision == DROP or attempts >= self.max_attempts or (decision == RESYNC and maybe_submitted):
+                # a number that may be in the mempool stays taken
+                if not maybe_submitted:
+                    self._release(address, seq)
+                return SubmissionResult(order, seq, False, attempts, response, error)
+
+            if decision in (RETRY, BACKOFF):
+                time.sleep(min(self.backoff * 2 ** (attempts - 1), self.max_backoff))
+            elif decision == RESYNC:
+                try:
+                    self.sequence_numbers.resync(address, seq)
+                    seq, request = self._resign(order)
+                except grpc.RpcError as e:
+                    return SubmissionResult(order, seq, False, attempts, response, e)
+
+    def submit(self, orders):
+        """ orders: [TransferOrder, ...], returns a SubmissionResult per order in the same order """
+        orders = list(orders)
+        seqs, requests = self._build_requests(orders)
+        futures = [
+            self.executor.submit(self._submit, order, seq, request)
+            for order, seq, request in zip(orders, seqs, requests)
+        ]
+        return [future.result() for future in futures]
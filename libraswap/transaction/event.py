@@ -0,0 +1,27 @@
+from canoser import Struct
+from canoser.types import *
+
+from libraswap.transaction.transaction import ADDRESS_LENGTH
+from libraswap.utils.types import ByteBufferT, Bytes
+
+
+class ContractEvent(Struct):
+    _fields = [
+        ('key', Bytes),
+        ('sequence_number', Uint64),
+        ('event_data', Bytes)
+    ]
+
+
+# event_data of both sent and received payment events,
+# address is the receiver of a sent event and the sender of a received event.
+class PaymentEvent(Struct):
+    _fields = [
+        ('amount', Uint64),
+        ('address', ByteBufferT(ADDRESS_LENGTH))
+    ]
+
+    @staticmethod
+    def decode_event(event):
+        # newer stdlib versions append metadata after the address
+        return PaymentEvent.deserialize(event.event_data, check=False)
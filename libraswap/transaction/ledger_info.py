@@ -0,0 +1,48 @@
+from canoser import RustOptional, Struct
+from canoser.types import *
+
+from libraswap.transaction.transaction import ADDRESS_LENGTH
+from libraswap.utils.types import ByteBufferT, Bytes
+
+
+class ValidatorPublicKeys(Struct):
+    _fields = [
+        ('account_address', ByteBufferT(ADDRESS_LENGTH)),
+        ('consensus_public_key', Bytes),
+        ('network_signing_public_key', Bytes),
+        ('network_identity_public_key', Bytes)
+    ]
+
+
+class ValidatorSet(Struct):
+    _fields = [
+        ('validator_public_keys', [ValidatorPublicKeys])
+    ]
+
+    @staticmethod
+    def from_proto(validator_set):
+        return ValidatorSet([
+            ValidatorPublicKeys(
+                keys.account_address,
+                keys.consensus_public_key,
+                keys.network_signing_public_key,
+                keys.network_identity_public_key
+            )
+            for keys in validator_set.validator_public_keys
+        ])
+
+
+class OptionalValidatorSet(RustOptional):
+    _type = ValidatorSet
+
+
+class LedgerInfo(Struct):
+    _fields = [
+        ('version', Uint64),
+        ('transaction_accumulator_hash', Bytes),
+        ('consensus_data_hash', Bytes),
+        ('consensus_block_id', Bytes),
+        ('epoch_num', Uint64),
+        ('timestamp_usecs', Uint64),
+        ('next_validator_set', OptionalValidatorSet)
+    ]
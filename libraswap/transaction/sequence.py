@@ -0,0 +1,47 @@
+import threading
+
+
+class SequenceNumberManager:
+    def __init__(self, client):
+        self.client = client
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def next(self, address):
+        with self._lock:
+            seq = self._next.get(address)
+            if seq is not None:
+                self._next[address] = seq + 1
+                return seq
+
+        # only the first call per account (or the first after a reset) goes to the ledger
+        fetched = self.client.get_account_state(address, fresh=True).sequence_number
+        with self._lock:
+            seq = self._next.setdefault(address, fetched)
+            self._next[address] = seq + 1
+            return seq
+
+    def reset(self, address):
+        # the ledger is authoritative again for the next transaction of this account
+        with self._lock:
+            self._next.pop(address, None)
+
+    def resync(self, address, failed_seq):
+        """ failed_seq was rejected for its sequence number, numbers below it may still be waiting in the mempool """
+        fetched = self.client.get_account_state(address, fresh=True).sequence_number
+        with self._lock:
+            current = self._next.get(address, failed_seq)
+            if failed_seq < fetched:
+                # failed_seq is used up, the numbers handed out after it may be pending
+                seq = max(fetched, current)
+            else:
+                # pipelined rejections of the same account keep the lowest failed number
+                seq = max(fetched, min(failed_seq, current))
+            self._next[address] = seq
+            return seq
+
+    def sync(self, address):
+        seq = self.client.get_account_state(address, fresh=True).sequence_number
+        with self._lock:
+            self._next[address] = seq
+        return seq
@@ -0,0 +1,90 @@
+import struct
+
+from canoser import Uint32
+
+from libraswap.transaction.transaction import (ADDRESS_LENGTH,
+                                               ED25519_PUBLIC_KEY_LENGTH,
+                                               ED25519_SIGNATURE_LENGTH,
+                                               TRANSFER_OPCODE, RawTransaction,
+                                               Script, TransactionArgument,
+                                               TransactionPayload)
+from libraswap.utils.hash import create_salted_hasher
+
+U64 = struct.Struct('<Q')
+
+
+class TransferTemplate:
+    def __init__(self, code=TRANSFER_OPCODE):
+        script = Script(
+            bytes.fromhex(code),
+            [
+                TransactionArgument('Address', bytes(ADDRESS_LENGTH)),
+                TransactionArgument('U64', 0)
+            ]
+        )
+        prototype = RawTransaction(bytes(ADDRESS_LENGTH), 0, TransactionPayload('Script', script), 0, 0, 0)
+        self.raw_txn = prototype.serialize()
+
+        # raw_txn = [sender_len][sender][sequence_number][payload][max_gas_amount][gas_unit_price][expiration_time]
+        # payload ends with [address_tag][address_len][recipient][u64_tag][amount]
+        # vector lengths and enum tags are both encoded as u32
+        u32_size = len(Uint32.encode(0))
+        self.sender_offset = u32_size
+        self.sequence_number_offset = self.sender_offset + ADDRESS_LENGTH
+        payload_end = self.sequence_number_offset + U64.size + len(TransactionPayload.encode(prototype.payload))
+        self.amount_offset = payload_end - U64.size
+        self.recipient_offset = self.amount_offset - u32_size - ADDRESS_LENGTH
+        self.max_gas_amount_offset = payload_end
+        self.gas_unit_price_offset = payload_end + U64.size
+        self.expiration_time_offset = payload_end + 2 * U64.size
+        assert len(self.raw_txn) == self.expiration_time_offset + U64.size
+
+        self.public_key_prefix = Uint32.encode(ED25519_PUBLIC_KEY_LENGTH)
+        self.signature_prefix = Uint32.encode(ED25519_SIGNATURE_LENGTH)
+        self.signed_txn_length = (
+            len(self.raw_txn) + len(self.public_key_prefix) + ED25519_PUBLIC_KEY_LENGTH
+            + len(self.signature_prefix) + ED25519_SIGNATURE_LENGTH
+        )
+
+    def raw_transaction(self, sender, seq, recipient, amount, max_gas_amount, gas_unit_price, expiration_time):
+        """ sender and recipient are 32-byte addresses """
+        assert len(sender) == ADDRESS_LENGTH and len(recipient) == ADDRESS_LENGTH
+        buf = bytearray(self.raw_txn)
+        buf[self.sender_offset:self.sender_offset + ADDRESS_LENGTH] = sender
+        buf[self.recipient_offset:self.recipient_offset + ADDRESS_LENGTH] = recipient
+        U64.pack_into(buf, self.sequence_number_offset, seq)
+        U64.pack_into(buf, self.amount_offset, amount)
+        U64.pack_into(buf, self.max_gas_amount_offset, max_gas_amount)
+        U64.pack_into(buf, self.gas_unit_price_offset, gas_unit_price)
+        U64.pack_into(buf, self.expiration_time_offset, expiration_time)
+        return bytes(buf)
+
+    @staticmethod
+    def hash(raw_txn):
+        m = create_salted_hasher(b'RawTransaction')
+        m.update(raw_txn)
+        return m.digest()
+
+    def signed_transaction(self, raw_txn, public_key, signature):
+        # same bytes as SignedTransaction(raw_txn, public_key, signature).serialize()
+        assert len(public_key) == ED25519_PUBLIC_KEY_LENGTH and len(signature) == ED25519_SIGNATURE_LENGTH
+        return b''.join((raw_txn, self.public_key_prefix, public_key, self.signature_prefix, signature))
+
+    def parse(self, signed_txn):
+        """ (sender, seq, recipient, amount, expiration_time) of a transfer made from this template, None otherwise """
+        if len(signed_txn) != self.signed_txn_length:
+            return None
+        # everything between the variable fields must be the template bytes, i.e. same code and argument types
+        payload_start = self.sequence_number_offset + U64.size
+        recipient_end = self.recipient_offset + ADDRESS_LENGTH
+        if (signed_txn[:self.sender_offset] != self.raw_txn[:self.sender_offset]
+                or signed_txn[payload_start:self.recipient_offset] != self.raw_txn[payload_start:self.recipient_offset]
+                or signed_txn[recipient_end:self.amount_offset] != self.raw_txn[recipient_end:self.amount_offset]):
+            return None
+        return (
+            bytes(signed_txn[self.sender_offset:self.sender_offset + ADDRESS_LENGTH]),
+            U64.unpack_from(signed_txn, self.sequence_number_offset)[0],
+            bytes(signed_txn[self.recipient_offset:recipient_end]),
+            U64.unpack_from(signed_txn, self.amount_offset)[0],
+            U64.unpack_from(signed_txn, self.expiration_time_offset)[0]
+        )
@@ -1,6 +1,7 @@
 from canoser import *
 
 from libraswap.lib.transaction_pb2 import TransactionArgument
+from libraswap.utils.types import ByteBufferT, Bytes
 
 # You could compile these codes (https://github.com/libra/libra/blob/master/language/stdlib/transaction_scripts/)
 # locally and convert the bytes code to hex string to get these values.
@@ -14,29 +15,29 @@ ED25519_SIGNATURE_LENGTH = 64
 class TransactionArgument(RustEnum):
     _enums = [
         ('U64', Uint64),
-        ('Address', [Uint8, ADDRESS_LENGTH]),
+        ('Address', ByteBufferT(ADDRESS_LENGTH)),
         ('String', str),
-        ('ByteArray', [Uint8])
+        ('ByteArray', Bytes)
     ]
 
 class WriteOp(RustEnum):
     _enums = [
         ('Deletion', None),
-        ('Value', [Uint8])
+        ('Value', Bytes)
     ]
 
 class AccessPath(Struct):
     _fields = [
-        ('address', [Uint8, ADDRESS_LENGTH]),
-        ('path', [Uint8])
+        ('address', ByteBufferT(ADDRESS_LENGTH)),
+        ('path', Bytes)
     ]
 
 
 class Program(Struct):
     _fields = [
-        ('code', [Uint8]),
+        ('code', Bytes),
         ('args', [TransactionArgument]),
-        ('modules', [[Uint8]])
+        ('modules', [Bytes])
     ]
 
 
@@ -48,13 +49,13 @@ class WriteSet(Struct):
 
 class Module(Struct):
     _fields = [
-        ('code', [Uint8])
+        ('code', Bytes)
     ]
 
 
 class Script(Struct):
     _fields = [
-        ('code', [Uint8]),
+        ('code', Bytes),
         ('args', [TransactionArgument])
     ]
 
@@ -70,7 +71,7 @@ class TransactionPayload(RustEnum):
 
 class RawTransaction(Struct):
     _fields = [
-        ('sender', [Uint8, ADDRESS_LENGTH]),
+        ('sender', ByteBufferT(ADDRESS_LENGTH)),
         ('sequence_number', Uint64),
         ('payload', TransactionPayload),
         ('max_gas_amount', Uint64),
@@ -82,6 +83,24 @@ class RawTransaction(Struct):
 class SignedTransaction(Struct):
     _fields = [
         ('raw_txn', RawTransaction),
-        ('public_key', [Uint8, ED25519_PUBLIC_KEY_LENGTH]),
-        ('signature', [Uint8, ED25519_SIGNATURE_LENGTH])
+        ('public_key', ByteBufferT(ED25519_PUBLIC_KEY_LENGTH)),
+        ('signature', ByteBufferT(ED25519_SIGNATURE_LENGTH))
     ]
+
+
+def touched_addresses(signed_txn):
+    """ hex addresses whose account state the transaction may change """
+    raw_txn = SignedTransaction.deserialize(signed_txn).raw_txn
+    addresses = {raw_txn.sender.hex()}
+    payload = raw_txn.payload
+    if payload.Script or payload.Program:
+        addresses.update(arg.value.hex() for arg in payload.value.args if arg.Address)
+    elif payload.WriteSet:
+        addresses.update(access_path.address.hex() for access_path, _ in payload.value.write_set)
+    return addresses
+
+
+def sender_and_sequence_number(signed_txn):
+    # a signed transaction starts with [sender_len][sender][sequence_number], the payload is never decoded
+    cursor = Cursor(signed_txn)
+    return ByteBufferT(ADDRESS_LENGTH).decode(cursor), Uint64.decode(cursor)
@@ -1,12 +1,14 @@
 from canoser import Struct
 from canoser.types import *
 
+from libraswap.utils.types import Bytes
+
 
 class TransactionInfo(Struct):
     _fields = [
-        ('signed_transaction_hash', [Uint8]),
-        ('state_root_hash', [Uint8]),
-        ('event_root_hash', [Uint8]),
+        ('signed_transaction_hash', Bytes),
+        ('state_root_hash', Bytes),
+        ('event_root_hash', Bytes),
         ('gas_used', Uint64),
         ('major_status', Uint64)
     ]
@@ -0,0 +1,202 @@
+import mmap
+import os
+
+from libraswap.lib.proof_pb2 import AccumulatorProof
+from libraswap.utils.verify import (ACCUMULATOR_PLACEHOLDER, _expand_siblings,
+                                    hash_accumulator_node)
+
+NODE_SIZE = 32
+
+
+def num_nodes(num_leaves):
+    # frozen nodes of an accumulator with num_leaves leaves
+    return 2 * num_leaves - bin(num_leaves).count('1')
+
+
+def postorder_position(level, index):
+    # every node of the complete subtrees to the left comes first, then this subtree with its root last
+    leaves_before = index << level
+    return num_nodes(leaves_before) + (2 << level) - 2
+
+
+class InMemoryAccumulator:
+    """ right edge of the transaction accumulator, enough to extend it and compute its root """
+
+    def __init__(self, frozen_subtree_roots=(), num_leaves=0):
+        # roots of the perfect subtrees covering all leaves, from the largest (leftmost) to the smallest
+        self.frozen_subtree_roots = list(frozen_subtree_roots)
+        self.num_leaves = num_leaves
+        assert len(self.frozen_subtree_roots) == bin(num_leaves).count('1')
+
+    def append(self, leaves):
+        for leaf in leaves:
+            self._append_leaf(leaf)
+        return self
+
+    def _append_leaf(self, leaf):
+        """ returns the nodes frozen by the new leaf in postorder, the leaf first """
+        nodes = [leaf]
+        mask = 1
+        # a new leaf completes every frozen subtree of the same size to its left
+        while self.num_leaves & mask:
+            nodes.append(hash_accumulator_node(self.frozen_subtree_roots.pop(), nodes[-1]))
+            mask <<= 1
+        self.frozen_subtree_roots.append(nodes[-1])
+        self.num_leaves += 1
+        return nodes
+
+    def append_subtrees(self, subtrees, num_new_leaves):
+        """ subtrees: roots of the subtrees representing the new leaves, as in AccumulatorConsistencyProof """
+        if self.num_leaves == 0:
+            self.frozen_subtree_roots = list(subtrees)
+            self.num_leaves = num_new_leaves
+            assert len(self.frozen_subtree_roots) == bin(num_new_leaves).count('1')
+            return self
+
+        subtrees = iter(subtrees)
+        remaining_new_leaves = num_new_leaves
+        # a new subtree as large as the rightmost frozen one merges with it, and possibly further left
+        rightmost_frozen_subtree_size = self.num_leaves & -self.num_leaves
+        while remaining_new_leaves >= rightmost_frozen_subtree_size:
+            mask = rightmost_frozen_subtree_size
+            current_hash = next(subtrees)
+            while self.num_leaves & mask:
+                current_hash = hash_accumulator_node(self.frozen_subtree_roots.pop(), current_hash)
+                mask <<= 1
+            self.frozen_subtree_roots.append(current_hash)
+            self.num_leaves += rightmost_frozen_subtree_size
+            remaining_new_leaves -= rightmost_frozen_subtree_size
+            rightmost_frozen_subtree_size = mask
+
+        # the remaining subtrees are all smaller than the rightmost frozen one
+        self.frozen_subtree_roots.extend(subtrees)
+        self.num_leaves += remaining_new_leaves
+        assert len(self.frozen_subtree_roots) == bin(self.num_leaves).count('1')
+        return self
+
+    @property
+    def root_hash(self):
+        if self.num_leaves == 0:
+            return ACCUMULATOR_PLACEHOLDER
+
+        frozen_subtree_roots = self.frozen_subtree_roots[:]
+        current_hash = frozen_subtree_roots.pop()
+        level = (self.num_leaves & -self.num_leaves).bit_length() - 1
+        root_level = (self.num_leaves - 1).bit_length()
+        # walk up the right edge, frozen subtrees on the left and placeholders on the right
+        while level < root_level:
+            if ((self.num_leaves - 1) >> level) % 2 == 1:
+                current_hash = hash_accumulator_node(frozen_subtree_roots.pop(), current_hash)
+            else:
+                current_hash = hash_accumulator_node(current_hash, ACCUMULATOR_PLACEHOLDER)
+            level += 1
+        assert len(frozen_subtree_roots) == 0
+        return current_hash
+
+    def verify_extension(self, first_version, first_proof):
+        """ checks that the proof of the next leaf was built on top of the leaves we already have """
+        assert first_version == self.num_leaves
+        depth = first_proof.bitmap.bit_length()
+        assert self.num_leaves >> depth == 0
+
+        # left siblings of the next leaf are exactly our frozen subtrees
+        siblings = _expand_siblings(first_proof, depth)
+        left_siblings = [siblings[level] for level in reversed(range(depth)) if (self.num_leaves >> level) % 2 == 1]
+        assert left_siblings == self.frozen_subtree_roots
+
+
+class AccumulatorNodeFile:
+    """ every frozen accumulator node, NODE_SIZE bytes each in postorder, so proofs can be built for any version """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._map = None
+
+        # an interrupted append may leave a partial tail, the next append overwrites it
+        stored = os.fstat(self._file.fileno()).st_size // NODE_SIZE
+        num_leaves = min(stored, (stored + 64) // 2)
+        while num_nodes(num_leaves) > stored:
+            num_leaves -= 1
+
+        frozen_subtree_roots = []
+        leaves_before = 0
+        for level in reversed(range(num_leaves.bit_length())):
+            if (num_leaves >> level) % 2 == 1:
+                frozen_subtree_roots.append(self._node(level, leaves_before >> level))
+                leaves_before += 1 << level
+        # the right edge kept in memory, extended leaf by leaf along with the file
+        self.frontier = InMemoryAccumulator(frozen_subtree_roots, num_leaves)
+
+    @property
+    def num_leaves(self):
+        return self.frontier.num_leaves
+
+    @property
+    def root_hash(self):
+        return self.frontier.root_hash
+
+    def verify_extension(self, first_version, first_proof):
+        self.frontier.verify_extension(first_version, first_proof)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, leaves):
+        offset = num_nodes(self.num_leaves) * NODE_SIZE
+        # new nodes in postorder always go to the end of the file
+        nodes = []
+        for leaf in leaves:
+            nodes.extend(self.frontier._append_leaf(leaf))
+        self._file.seek(offset)
+        self._file.write(b''.join(nodes))
+        self._file.truncate()
+        self._file.flush()
+        return self
+
+    def _node(self, level, index):
+        offset = postorder_position(level, index) * NODE_SIZE
+        if self._map is None or len(self._map) < offset + NODE_SIZE:
+            # the file has grown since it was mapped
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + NODE_SIZE]
+
+    def _subtree_hash(self, level, index, num_leaves):
+        # hash of a subtree in the accumulator of the first num_leaves leaves
+        if (index + 1) << level <= num_leaves:
+            return self._node(level, index)
+        if index << level >= num_leaves:
+            return ACCUMULATOR_PLACEHOLDER
+        return hash_accumulator_node(
+            self._subtree_hash(level - 1, 2 * index, num_leaves),
+            self._subtree_hash(level - 1, 2 * index + 1, num_leaves)
+        )
+
+    def root_at(self, num_leaves):
+        assert num_leaves <= self.num_leaves
+        if num_leaves == 0:
+            return ACCUMULATOR_PLACEHOLDER
+        return self._subtree_hash((num_leaves - 1).bit_length(), 0, num_leaves)
+
+    def proof(self, version, num_leaves):
+        """ AccumulatorProof of the leaf at version against the root of the first num_leaves leaves """
+        assert version < num_leaves <= self.num_leaves
+        bitmap = 0
+        siblings = []
+        for level in range((num_leaves - 1).bit_length()):
+            sibling = self._subtree_hash(level, (version >> level) ^ 1, num_leaves)
+            if sibling != ACCUMULATOR_PLACEHOLDER:
+                bitmap |= 1 << level
+                siblings.append(sibling)
+        # non_default_siblings go from the root down
+        return AccumulatorProof(bitmap=bitmap, non_default_siblings=siblings[::-1])
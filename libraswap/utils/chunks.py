@@ -0,0 +1,7 @@
+def run_chunks(executor, fn, calls):
+    """ [fn(*args) for args in calls], spread over executor, the first failure is re-raised """
+    # one call is run in the caller, handing it to a worker would only add the round trip
+    if len(calls) == 1:
+        return [fn(*calls[0])]
+    futures = [executor.submit(fn, *args) for args in calls]
+    return [future.result() for future in futures]
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from libraswap.lib.proof_pb2 import AccumulatorProof
+from libraswap.lib.transaction_info_pb2 import TransactionInfo
+from libraswap.lib.transaction_pb2 import SignedTransaction
+from libraswap.utils.chunks import run_chunks
+from libraswap.utils.verify import (verify_tx_hash, verify_tx_list,
+                                    verify_tx_proofs_batch,
+                                    verify_txs_with_proof)
+
+
+def _verify_proof_chunk(root, chunk):
+    # chunk = [(tx_info_bytes, tx_version, proof_bytes), ...]
+    verify_tx_proofs_batch([
+        (TransactionInfo.FromString(tx_info), tx_version, AccumulatorProof.FromString(proof))
+        for tx_info, tx_version, proof in chunk
+    ], root)
+    return len(chunk)
+
+
+def _verify_hash_chunk(chunk):
+    # chunk = [(signed_txn_bytes, tx_hash), ...]
+    for signed_txn, tx_hash in chunk:
+        verify_tx_hash(SignedTransaction(signed_txn=signed_txn), tx_hash)
+    return len(chunk)
+
+
+class VerificationEngine:
+    def __init__(self, max_workers=None, chunk_size=512):
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(max_workers)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _chunks(self, work):
+        return [work[i:i + self.chunk_size] for i in range(0, len(work), self.chunk_size)]
+
+    def _run(self, fn, chunks, *args):
+        # raises the AssertionError of a failed chunk
+        run_chunks(self.executor, fn, [args + (chunk,) for chunk in chunks])
+
+    def verify_tx_proofs(self, items, root):
+        """ items: [(tx_info, tx_version, proof), ...] """
+        # neighbouring versions share most of their path, so keep them in the same chunk
+        work = sorted(
+            ((tx_info.SerializeToString(), tx_version, proof.SerializeToString()) for tx_info, tx_version, proof in items),
+            key=lambda w: w[1]
+        )
+        if work:
+            self._run(_verify_proof_chunk, self._chunks(work), root)
+
+    def verify_tx_hashes(self, items):
+        """ items: [(signed_transaction, tx_hash), ...] """
+        work = [(tx.signed_txn, tx_hash) for tx, tx_hash in items]
+        if work:
+            self._run(_verify_hash_chunk, self._chunks(work))
+
+    def verify_txs_with_proof(self, txs_with_proof, root):
+        verify_txs_with_proof(txs_with_proof, root, self.verify_tx_hashes, self.verify_tx_proofs)
+
+    def verify_tx_list(self, txn_list, root):
+        return verify_tx_list(txn_list, root, self.verify_tx_hashes)
@@ -10,3 +10,16 @@ def create_hasher_prefix(salt):
     m.update(salt)
     m.update(b'@@$$LIBRA$$@@')
     return m.digest()
+
+
+_salted_hashers = {}
+
+
+def create_salted_hasher(salt):
+    # hasher already fed with the salt prefix, copying it skips rehashing the prefix
+    hasher = _salted_hashers.get(salt)
+    if hasher is None:
+        hasher = create_hasher()
+        hasher.update(create_hasher_prefix(salt))
+        _salted_hashers[salt] = hasher
+    return hasher.copy()
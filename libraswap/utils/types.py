@@ -0,0 +1,33 @@
+from canoser import Uint32
+
+
+class ByteBufferT:
+    """ Same encoding as [Uint8] / [Uint8, N], but values are bytes instead of lists of ints """
+
+    def __init__(self, fixed_len=None):
+        self.fixed_len = fixed_len
+
+    def encode(self, value):
+        return Uint32.encode(len(value)) + bytes(value)
+
+    def decode(self, cursor):
+        size = Uint32.decode(cursor)
+        if self.fixed_len is not None and size != self.fixed_len:
+            raise TypeError(f"{size} is not equal to predefined value: {self.fixed_len}")
+        # a slice of bytes is returned as is, a slice of a memoryview is copied once
+        return bytes(cursor.read_bytes(size))
+
+    def check_value(self, value):
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise TypeError('value {} is not bytes'.format(value))
+        if self.fixed_len is not None and len(value) != self.fixed_len:
+            raise TypeError("bytes len not match: {}-{}".format(len(value), self.fixed_len))
+
+    def __eq__(self, other):
+        return isinstance(other, ByteBufferT) and self.fixed_len == other.fixed_len
+
+    def __hash__(self):
+        return hash((ByteBufferT, self.fixed_len))
+
+
+Bytes = ByteBufferT()
@@ -1,7 +1,14 @@
-from libraswap.utils.hash import create_hasher, create_hasher_prefix
+from libraswap.utils.hash import create_salted_hasher
+from libraswap.transaction.event import ContractEvent
+from libraswap.transaction.ledger_info import (LedgerInfo,
+                                               OptionalValidatorSet,
+                                               ValidatorSet)
 from libraswap.transaction.transaction_info import TransactionInfo
 
 ACCUMULATOR_PLACEHOLDER = b'ACCUMULATOR_PLACEHOLDER_HASH\000\000\000\000'
+# an empty subtree of any height in the sparse merkle tree hashes to this placeholder
+SPARSE_MERKLE_PLACEHOLDER = b'SPARSE_MERKLE_PLACEHOLDER_HASH\000\000'
+HASH_LENGTH_IN_BITS = 256
 
 
 def verify_events(events):
@@ -9,7 +16,7 @@ def verify_events(events):
     assert len(events) == 2
 
 
-def verify_tx_proof(tx_info, tx_version, proof, root):
+def hash_tx_info(tx_info):
     info = TransactionInfo(
         tx_info.signed_transaction_hash,
         tx_info.state_root_hash,
@@ -19,36 +26,293 @@ def verify_tx_proof(tx_info, tx_version, proof, root):
     )
 
     # tx_info = Hash(signed_tx, state_root, event_root, gas_used, major_status)
-    m = create_hasher()
-    m.update(create_hasher_prefix(b'TransactionInfo'))
+    m = create_salted_hasher(b'TransactionInfo')
+    m.update(info.serialize())
+    return m.digest()
+
+
+def hash_ledger_info(ledger_info):
+    next_validator_set = None
+    if ledger_info.HasField('next_validator_set'):
+        next_validator_set = ValidatorSet.from_proto(ledger_info.next_validator_set)
+    info = LedgerInfo(
+        ledger_info.version,
+        ledger_info.transaction_accumulator_hash,
+        ledger_info.consensus_data_hash,
+        ledger_info.consensus_block_id,
+        ledger_info.epoch_num,
+        ledger_info.timestamp_usecs,
+        OptionalValidatorSet(next_validator_set)
+    )
+
+    # validators sign Hash(ledger_info)
+    m = create_salted_hasher(b'LedgerInfo')
     m.update(info.serialize())
-    result = m.digest()
+    return m.digest()
+
+
+def hash_accumulator_node(left, right, salt=b'TransactionAccumulator'):
+    # tree_node = Hash(left_child, right_child)
+    m = create_salted_hasher(salt)
+    m.update(left)
+    m.update(right)
+    return m.digest()
+
+
+def accumulator_root(leaf, index, proof, salt=b'TransactionAccumulator'):
+    result = leaf
 
     bitmap = proof.bitmap
     siblings = proof.non_default_siblings[:]
     while bitmap > 0:
-        # tree_node = Hash(left_child, right_child)
-        m = create_hasher()
-        m.update(create_hasher_prefix(b'TransactionAccumulator'))
         sibling = ACCUMULATOR_PLACEHOLDER if bitmap % 2 == 0 else siblings.pop()
-        if tx_version % 2 == 0:
-            m.update(result)
-            m.update(sibling)
+        if index % 2 == 0:
+            result = hash_accumulator_node(result, sibling, salt)
         else:
-            m.update(sibling)
-            m.update(result)
-        result = m.digest()
+            result = hash_accumulator_node(sibling, result, salt)
 
         bitmap //= 2
-        tx_version //= 2
+        index //= 2
     assert len(siblings) == 0
-    assert result == root
+    return result
 
 
-def verify_tx_hash(tx, tx_hash):
+def verify_tx_proof(tx_info, tx_version, proof, root):
+    assert accumulator_root(hash_tx_info(tx_info), tx_version, proof) == root
+
+
+def verify_tx_proofs_batch(items, root):
+    """ items: [(tx_info, tx_version, proof), ...] all proven against the same root """
+    # nodes already proven to lead to root, keyed by (level, index)
+    proven = {}
+    for tx_info, tx_version, proof in items:
+        result = hash_tx_info(tx_info)
+
+        bitmap = proof.bitmap
+        siblings = proof.non_default_siblings[:]
+        level, index = 0, tx_version
+        path = []
+        # an identical hash at an already proven position means the rest of the path is proven too
+        while proven.get((level, index)) != result:
+            if bitmap == 0:
+                assert len(siblings) == 0
+                assert result == root
+                break
+            path.append(((level, index), result))
+            sibling = ACCUMULATOR_PLACEHOLDER if bitmap % 2 == 0 else siblings.pop()
+            if index % 2 == 0:
+                result = hash_accumulator_node(result, sibling)
+            else:
+                result = hash_accumulator_node(sibling, result)
+
+            bitmap //= 2
+            level += 1
+            index //= 2
+        path.append(((level, index), result))
+        proven.update(path)
+
+
+def hash_signed_transaction(signed_txn):
     # tx_hash = Hash(signed_txn)
-    m = create_hasher()
-    m.update(create_hasher_prefix(b'SignedTransaction'))
-    m.update(tx.signed_txn)
+    m = create_salted_hasher(b'SignedTransaction')
+    m.update(signed_txn)
+    return m.digest()
+
+
+def verify_tx_hash(tx, tx_hash):
+    assert hash_signed_transaction(tx.signed_txn) == tx_hash
+
+
+def verify_tx_hashes(items):
+    """ items: [(signed_transaction, tx_hash), ...] """
+    for tx, tx_hash in items:
+        verify_tx_hash(tx, tx_hash)
+
+
+def verify_txs_with_proof(txs_with_proof, root, verify_tx_hashes=verify_tx_hashes, verify_tx_proofs=verify_tx_proofs_batch):
+    """ txs_with_proof: [SignedTransactionWithProof, ...], the hash and proof steps can be swapped for parallel ones """
+    for tx_with_proof in txs_with_proof:
+        verify_events(tx_with_proof.events.events)
+    verify_tx_hashes([
+        (tx_with_proof.signed_transaction, tx_with_proof.proof.transaction_info.signed_transaction_hash)
+        for tx_with_proof in txs_with_proof
+    ])
+
+    # transactions under one root share the upper accumulator nodes
+    verify_tx_proofs([
+        (tx_with_proof.proof.transaction_info, tx_with_proof.version, tx_with_proof.proof.ledger_info_to_transaction_info_proof)
+        for tx_with_proof in txs_with_proof
+    ], root)
+
+
+def _expand_siblings(proof, depth):
+    # siblings from the leaf level up, placeholders filled in
+    bitmap = proof.bitmap
+    siblings = proof.non_default_siblings[:]
+    expanded = []
+    for _ in range(depth):
+        expanded.append(ACCUMULATOR_PLACEHOLDER if bitmap % 2 == 0 else siblings.pop())
+        bitmap //= 2
+    assert len(siblings) == 0
+    return expanded
+
+
+def verify_tx_range_proof(leaves, first_version, first_proof, last_proof, root):
+    # the top sibling is never a placeholder, so the bitmap length is the tree depth
+    depth = first_proof.bitmap.bit_length()
+    assert last_proof.bitmap.bit_length() == depth
+    left_siblings = _expand_siblings(first_proof, depth)
+    right_siblings = _expand_siblings(last_proof, depth)
+
+    # rebuild the root from the contiguous leaves plus the left edge of the first proof and the right edge of the last
+    nodes = list(leaves)
+    index = first_version
+    for level in range(depth):
+        if index % 2 == 1:
+            nodes.insert(0, left_siblings[level])
+            index -= 1
+        if len(nodes) % 2 == 1:
+            nodes.append(right_siblings[level])
+        nodes = [hash_accumulator_node(nodes[i], nodes[i + 1]) for i in range(0, len(nodes), 2)]
+        index //= 2
+    assert len(nodes) == 1
+    assert nodes[0] == root
+
+
+def verify_tx_list(txn_list, root, verify_tx_hashes=verify_tx_hashes):
+    txs = txn_list.transactions
+    infos = txn_list.infos
+    assert len(txs) == len(infos)
+    if len(txs) == 0:
+        return []
+
+    verify_tx_hashes([(tx, info.signed_transaction_hash) for tx, info in zip(txs, infos)])
+
+    leaves = [hash_tx_info(info) for info in infos]
+    verify_tx_range_proof(
+        leaves,
+        txn_list.first_transaction_version.value,
+        txn_list.proof_of_first_transaction,
+        txn_list.proof_of_last_transaction,
+        root
+    )
+    return leaves
+
+
+def hash_event(event):
+    # event = Hash(key, sequence_number, event_data)
+    m = create_salted_hasher(b'ContractEvent')
+    m.update(ContractEvent(event.key, event.sequence_number, event.event_data).serialize())
+    return m.digest()
+
+
+def event_accumulator_root(events):
+    # the events of one transaction are the leaves of its own accumulator
+    nodes = [hash_event(event) for event in events]
+    if len(nodes) == 0:
+        return ACCUMULATOR_PLACEHOLDER
+    while len(nodes) > 1:
+        if len(nodes) % 2 == 1:
+            nodes.append(ACCUMULATOR_PLACEHOLDER)
+        nodes = [hash_accumulator_node(nodes[i], nodes[i + 1], b'EventAccumulator') for i in range(0, len(nodes), 2)]
+    return nodes[0]
+
+
+def verify_events_for_versions(events_for_versions, infos):
+    """ events_for_versions: [EventsList, ...] one per transaction info """
+    assert len(events_for_versions) == len(infos)
+    for events, info in zip(events_for_versions, infos):
+        assert event_accumulator_root(events.events) == info.event_root_hash
+
+
+def verify_events_with_proof(events_with_proof, root):
+    for event_with_proof in events_with_proof:
+        proof = event_with_proof.proof
+        event_root = accumulator_root(hash_event(event_with_proof.event), event_with_proof.event_index, proof.transaction_info_to_event_proof, b'EventAccumulator')
+        assert event_root == proof.transaction_info.event_root_hash
+
+    # events of one transaction share its transaction info path
+    verify_tx_proofs_batch([
+        (e.proof.transaction_info, e.transaction_version, e.proof.ledger_info_to_transaction_info_proof)
+        for e in events_with_proof
+    ], root)
+
+
+def _salted_hash(salt, *data):
+    m = create_salted_hasher(salt)
+    for d in data:
+        m.update(d)
+    return m.digest()
+
+
+def hash_sparse_merkle_node(left, right):
+    return _salted_hash(b'SparseMerkleInternal', left, right)
+
+
+def _sparse_merkle_siblings(proof):
+    # siblings from the root down to the leaf, placeholders filled in
+    siblings = iter(proof.non_default_siblings)
+    expanded = []
+    for byte in proof.bitmap:
+        for i in range(8):
+            expanded.append(next(siblings) if byte & (0x80 >> i) else SPARSE_MERKLE_PLACEHOLDER)
+    assert next(siblings, None) is None
+    # the bitmap ends at the bottom sibling, which is never a placeholder
+    while expanded and expanded[-1] == SPARSE_MERKLE_PLACEHOLDER:
+        expanded.pop()
+    assert len(expanded) <= HASH_LENGTH_IN_BITS
+    return expanded
+
+
+def verify_sparse_merkle_proofs_batch(items):
+    """ items: [(key, blob, proof, state_root), ...], a None blob asks for a non-inclusion proof """
+    # nodes already proven to lead to their state root, keyed by (state_root, depth, key prefix)
+    proven = {}
+    for key, blob, proof, state_root in items:
+        leaf = proof.leaf
+        assert len(leaf) in (0, 64)
+        siblings = _sparse_merkle_siblings(proof)
+        if blob is not None:
+            assert len(leaf) == 64
+            assert leaf[:32] == key
+            assert leaf[32:] == _salted_hash(b'AccountStateBlob', blob)
+        elif len(leaf) == 64:
+            # the subtree holds exactly one other key sharing our prefix down to the leaf
+            assert leaf[:32] != key
+            common = HASH_LENGTH_IN_BITS - (int.from_bytes(key, 'big') ^ int.from_bytes(leaf[:32], 'big')).bit_length()
+            assert common >= len(siblings)
+
+        result = _salted_hash(b'SparseMerkleLeafNode', leaf) if leaf else SPARSE_MERKLE_PLACEHOLDER
+        key_bits = int.from_bytes(key, 'big')
+        path = []
+        depth = len(siblings)
+        while proven.get((state_root, depth, key_bits >> (HASH_LENGTH_IN_BITS - depth))) != result:
+            if depth == 0:
+                assert result == state_root
+                break
+            path.append(((state_root, depth, key_bits >> (HASH_LENGTH_IN_BITS - depth)), result))
+            depth -= 1
+            sibling = siblings[depth]
+            if (key_bits >> (HASH_LENGTH_IN_BITS - 1 - depth)) & 1:
+                result = hash_sparse_merkle_node(sibling, result)
+            else:
+                result = hash_sparse_merkle_node(result, sibling)
+        path.append(((state_root, depth, key_bits >> (HASH_LENGTH_IN_BITS - depth)), result))
+        proven.update(path)
+
 
-    assert m.digest() == tx_hash
+def verify_account_states_batch(items, root):
+    """ items: [(address, account_state_with_proof), ...] where address is 32 bytes """
+    verify_tx_proofs_batch([
+        (state.proof.transaction_info, state.version, state.proof.ledger_info_to_transaction_info_proof)
+        for _, state in items
+    ], root)
+    verify_sparse_merkle_proofs_batch([
+        (
+            _salted_hash(b'AccountAddress', address),
+            state.blob.blob if len(state.blob.blob) > 0 else None,
+            state.proof.transaction_info_to_account_proof,
+            state.proof.transaction_info.state_root_hash
+        )
+        for address, state in items
+    ])
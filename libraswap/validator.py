@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from libraswap.utils.verify import hash_ledger_info
+
+
+class ValidatorVerifier:
+    """ checks that ledger infos are signed by a quorum of the validator set of their epoch """
+
+    def __init__(self, validator_set, epoch_num=0, max_verified=1024):
+        self.max_verified = max_verified
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+        self._set_validators(validator_set, epoch_num)
+
+    @staticmethod
+    def from_hex(consensus_public_keys, epoch_num=0):
+        """ consensus_public_keys: {validator address hex: consensus public key hex} """
+        return ValidatorVerifier([
+            (bytes.fromhex(address), bytes.fromhex(public_key))
+            for address, public_key in consensus_public_keys.items()
+        ], epoch_num)
+
+    def _set_validators(self, validator_set, epoch_num):
+        """ validator_set: a ValidatorSet (proto or struct) or [(address, consensus_public_key), ...] """
+        if hasattr(validator_set, 'validator_public_keys'):
+            validator_set = [
+                (keys.account_address, keys.consensus_public_key)
+                for keys in validator_set.validator_public_keys
+            ]
+        # keys are parsed once per epoch rather than once per signature
+        verify_keys = {bytes(address): VerifyKey(bytes(public_key)) for address, public_key in validator_set}
+        assert len(verify_keys) > 0
+        with self._lock:
+            self.verify_keys = verify_keys
+            # every validator has the same voting power, 2f + 1 out of 3f + 1
+            self.quorum_size = len(verify_keys) * 2 // 3 + 1
+            self.epoch_num = epoch_num
+
+    def verify(self, ledger_info_with_sigs):
+        ledger_info = ledger_info_with_sigs.ledger_info
+        ledger_info_hash = hash_ledger_info(ledger_info)
+        with self._lock:
+            # a ledger info verified once stays valid, even after its epoch has ended
+            if ledger_info_hash in self._verified:
+                self._verified.move_to_end(ledger_info_hash)
+                return ledger_info_hash
+            assert ledger_info.epoch_num == self.epoch_num
+            verify_keys = self.verify_keys
+            quorum_size = self.quorum_size
+
+        # once a quorum has signed, the remaining signatures can not change the outcome
+        signers = set()
+        for signature in ledger_info_with_sigs.signatures:
+            if len(signers) >= quorum_size:
+                break
+            validator_id = bytes(signature.validator_id)
+            verify_key = verify_keys.get(validator_id)
+            if verify_key is None or validator_id in signers:
+                continue
+            try:
+                verify_key.verify(ledger_info_hash, signature.signature)
+            except BadSignatureError:
+                continue
+            signers.add(validator_id)
+        assert len(signers) >= quorum_size
+
+        with self._lock:
+            self._verified[ledger_info_hash] = ledger_info.version
+            while len(self._verified) > self.max_verified:
+                self._verified.popitem(last=False)
+        return ledger_info_hash
+
+    def _advance_epoch(self, ledger_info_with_sigs):
+        # the last ledger info of an epoch is signed by the old set and carries the new one
+        self.verify(ledger_info_with_sigs)
+        ledger_info = ledger_info_with_sigs.ledger_info
+        assert ledger_info.HasField('next_validator_set')
+        self._set_validators(ledger_info.next_validator_set, ledger_info.epoch_num + 1)
+
+    def verify_update_to_latest_ledger(self, response):
+        for change in response.validator_change_events:
+            if change.ledger_info_with_sigs.ledger_info.epoch_num < self.epoch_num:
+                continue
+            self._advance_epoch(change.ledger_info_with_sigs)
+
+        ledger_info_with_sigs = response.ledger_info_with_sigs
+        ledger_info = ledger_info_with_sigs.ledger_info
+        if ledger_info.epoch_num == self.epoch_num and ledger_info.HasField('next_validator_set'):
+            self._advance_epoch(ledger_info_with_sigs)
+        else:
+            self.verify(ledger_info_with_sigs)
+        return response
@@ -14,6 +14,10 @@ class Account:
     def sign(self, message):
         return self._signing_key.sign(message)
 
+    def sign_detached(self, message):
+        # the 64-byte signature without the message appended
+        return self._signing_key.sign(message).signature
+
     @property
     def public_key(self):
         return self._verify_key.encode().hex()
@@ -1,27 +1,34 @@
+import struct
+from collections import namedtuple
+
 from canoser import Struct
 from canoser.types import *
 
+from libraswap.utils.types import Bytes
+
 
 # FIXME: I don't know how exactly to generate the account state path yet.
 #        This value is fixed so we make a constance here.
 #        However, since we are using keccak256, the value should be changed if
 #        we use sha3-256.
 ACCOUNT_STATE_PATH = '01296d2b26a8976ed85bbb78f1e8a7b424499a1a91a5189c9d2c36cda6d74a252d'
+ACCOUNT_SENT_EVENTS_PATH = ACCOUNT_STATE_PATH + b'/sent_events_count/'.hex()
+ACCOUNT_RECEIVED_EVENTS_PATH = ACCOUNT_STATE_PATH + b'/received_events_count/'.hex()
 
 class EventHandle(Struct):
     _fields = [
         ('count', Uint64),
-        ('key', [Uint8])
+        ('key', Bytes)
     ]
 
     @staticmethod
     def empty():
-        return EventHandle(0, [])
+        return EventHandle(0, b'')
 
 
 class AccountResource(Struct):
     _fields = [
-        ('authentication_key', [Uint8]),
+        ('authentication_key', Bytes),
         ('balance', Uint64),
         ('delegated_key_rotation_capability', bool),
         ('delegated_withdrawal_capability', bool),
@@ -32,14 +39,12 @@ class AccountResource(Struct):
 
     @property
     def address(self):
-        return bytes(self.authentication_key).hex()
+        return self.authentication_key.hex()
 
     @staticmethod
     def empty(address):
         if isinstance(address, str):
             address = bytes.fromhex(address)
-        if isinstance(address, bytes):
-            address = list(address)
         return AccountResource(address, 0, False, False, EventHandle.empty(), EventHandle.empty(), 0)
 
     def __str__(self):
@@ -52,7 +57,170 @@ sent_events_count: {self.sent_events.count}
 sequence_number: {self.sequence_number}'''
 
 
+class FrozenEventHandle(namedtuple('FrozenEventHandle', ['count', 'key'])):
+    __slots__ = ()
+
+    @staticmethod
+    def from_struct(handle):
+        return FrozenEventHandle(handle.count, bytes(handle.key))
+
+    def to_struct(self):
+        return EventHandle(self.count, self.key)
+
+
+# immutable, dict-free AccountResource for large resident caches
+class FrozenAccountResource(namedtuple('FrozenAccountResource', [name for name, _ in AccountResource._fields])):
+    __slots__ = ()
+
+    @property
+    def address(self):
+        return self.authentication_key.hex()
+
+    @staticmethod
+    def from_struct(resource):
+        return FrozenAccountResource(
+            bytes(resource.authentication_key),
+            resource.balance,
+            resource.delegated_key_rotation_capability,
+            resource.delegated_withdrawal_capability,
+            FrozenEventHandle.from_struct(resource.received_events),
+            FrozenEventHandle.from_struct(resource.sent_events),
+            resource.sequence_number
+        )
+
+    def to_struct(self):
+        return AccountResource(
+            self.authentication_key,
+            self.balance,
+            self.delegated_key_rotation_capability,
+            self.delegated_withdrawal_capability,
+            self.received_events.to_struct(),
+            self.sent_events.to_struct(),
+            self.sequence_number
+        )
+
+
 class AccountState(Struct):
     _fields = [
-        ('blob', {})
+        ('blob', {Bytes: Bytes})
     ]
+
+
+U32 = struct.Struct('<L')
+U64 = struct.Struct('<Q')
+
+
+def find_account_resource(blob):
+    """ (offset, length) of the AccountResource inside an AccountState blob, None for an empty blob """
+    if len(blob) == 0:
+        return None
+    path = bytes.fromhex(ACCOUNT_STATE_PATH)
+    (count,) = U32.unpack_from(blob, 0)
+    offset = U32.size
+    for _ in range(count):
+        (key_len,) = U32.unpack_from(blob, offset)
+        key = blob[offset + U32.size:offset + U32.size + key_len]
+        offset += U32.size + key_len
+        (value_len,) = U32.unpack_from(blob, offset)
+        offset += U32.size
+        if key == path:
+            return offset, value_len
+        offset += value_len
+    # an account that exists always holds an AccountResource
+    raise KeyError(ACCOUNT_STATE_PATH)
+
+
+class AccountResourceView:
+    """ Read-only AccountResource decoded field by field from the blob """
+    __slots__ = ('_blob', '_offset', '_address')
+
+    def __init__(self, blob, address=None):
+        self._blob = memoryview(blob)
+        location = find_account_resource(self._blob)
+        self._offset = None if location is None else location[0]
+        self._address = address
+
+    def _u64(self, offset):
+        return U64.unpack_from(self._blob, offset)[0]
+
+    def _bytes(self, offset):
+        (length,) = U32.unpack_from(self._blob, offset)
+        return self._blob[offset + U32.size:offset + U32.size + length]
+
+    def _skip_bytes(self, offset):
+        return offset + U32.size + U32.unpack_from(self._blob, offset)[0]
+
+    # offsets of the fields following authentication_key
+    def _balance_offset(self):
+        return self._skip_bytes(self._offset)
+
+    def _received_events_offset(self):
+        # balance, then the two capability bools
+        return self._balance_offset() + U64.size + 2
+
+    def _sent_events_offset(self):
+        return self._skip_bytes(self._received_events_offset() + U64.size)
+
+    def _sequence_number_offset(self):
+        return self._skip_bytes(self._sent_events_offset() + U64.size)
+
+    @property
+    def exists(self):
+        return self._offset is not None
+
+    @property
+    def authentication_key(self):
+        if self._offset is None:
+            return bytes.fromhex(self._address) if self._address else b''
+        return bytes(self._bytes(self._offset))
+
+    @property
+    def address(self):
+        if self._offset is None:
+            return self._address
+        return self._bytes(self._offset).hex()
+
+    @property
+    def balance(self):
+        return 0 if self._offset is None else self._u64(self._balance_offset())
+
+    @property
+    def delegated_key_rotation_capability(self):
+        return False if self._offset is None else self._blob[self._balance_offset() + U64.size] == 1
+
+    @property
+    def delegated_withdrawal_capability(self):
+        return False if self._offset is None else self._blob[self._balance_offset() + U64.size + 1] == 1
+
+    @property
+    def received_events_count(self):
+        return 0 if self._offset is None else self._u64(self._received_events_offset())
+
+    @property
+    def sent_events_count(self):
+        return 0 if self._offset is None else self._u64(self._sent_events_offset())
+
+    @property
+    def sequence_number(self):
+        return 0 if self._offset is None else self._u64(self._sequence_number_offset())
+
+    def freeze(self):
+        if self._offset is None:
+            return FrozenAccountResource.from_struct(AccountResource.empty(self._address))
+        received_events = self._received_events_offset()
+        sent_events = self._sent_events_offset()
+        return FrozenAccountResource(
+            self.authentication_key,
+            self.balance,
+            self.delegated_key_rotation_capability,
+            self.delegated_withdrawal_capability,
+            FrozenEventHandle(self._u64(received_events), bytes(self._bytes(received_events + U64.size))),
+            FrozenEventHandle(self._u64(sent_events), bytes(self._bytes(sent_events + U64.size))),
+            self.sequence_number
+        )
+
+    def to_resource(self):
+        if self._offset is None:
+            return AccountResource.empty(self._address)
+        (length,) = U32.unpack_from(self._blob, self._offset - U32.size)
+        return AccountResource.deserialize(self._blob[self._offset:self._offset + length])
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS accounts (
+    account_index INTEGER PRIMARY KEY,
+    address BLOB NOT NULL UNIQUE,
+    public_key BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wallet (
+    first_address BLOB NOT NULL
+);
+'''
+
+
+class AccountIndex:
+    """ on-disk index -> (address, public_key) of the accounts of one wallet, and address -> index """
+
+    def __init__(self, path, wallet):
+        self.path = path
+        self.wallet = wallet
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # the first address identifies the wallet without keeping anything secret on disk
+        first_address = bytes.fromhex(wallet.new_account(0).address)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            row = self._conn.execute('SELECT first_address FROM wallet').fetchone()
+            if row is None:
+                self._conn.execute('INSERT INTO wallet VALUES (?)', (first_address,))
+            elif row[0] != first_address:
+                raise ValueError(f'{path} indexes the accounts of another wallet')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def derive_range(self, start, count, max_workers=None):
+        """ [(index, address, public_key), ...] like LibraWallet.derive_range, only missing accounts are derived """
+        with self._lock:
+            known = {
+                row[0]: (row[0], row[1].hex(), row[2].hex())
+                for row in self._conn.execute(
+                    'SELECT account_index, address, public_key FROM accounts WHERE account_index >= ? AND account_index < ?',
+                    (start, start + count)
+                )
+            }
+
+        # derive every run of missing indices in one go
+        index = start
+        while index < start + count:
+            if index in known:
+                index += 1
+                continue
+            end = index
+            while end < start + count and end not in known:
+                end += 1
+            derived = self.wallet.derive_range(index, end - index, max_workers)
+            with self._lock, self._conn:
+                self._conn.executemany('INSERT OR IGNORE INTO accounts VALUES (?, ?, ?)', [
+                    (i, bytes.fromhex(address), bytes.fromhex(public_key)) for i, address, public_key in derived
+                ])
+            known.update((account[0], account) for account in derived)
+            index = end
+        return [known[i] for i in range(start, start + count)]
+
+    def get(self, index):
+        """ (address, public_key) of the account at index, or None if it has not been derived yet """
+        with self._lock:
+            row = self._conn.execute('SELECT address, public_key FROM accounts WHERE account_index = ?', (index,)).fetchone()
+        return None if row is None else (row[0].hex(), row[1].hex())
+
+    def index_of(self, address):
+        """ index of the account with this hex address, or None if it is not in the index """
+        with self._lock:
+            row = self._conn.execute('SELECT account_index FROM accounts WHERE address = ?', (bytes.fromhex(address),)).fetchone()
+        return None if row is None else row[0]
+
+    def account(self, address):
+        """ the Account, with its signing key, of an indexed address """
+        index = self.index_of(address)
+        return None if index is None else self.wallet.new_account(index)
@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from libraswap.transaction.transaction import ED25519_SIGNATURE_LENGTH
+from libraswap.utils.chunks import run_chunks
+from libraswap.wallet.account import Account
+
+
+def _sign_chunk(chunk):
+    # chunk = [(private_key, message), ...], each key is loaded once per chunk in the worker process
+    accounts = {}
+    signatures = []
+    for private_key, message in chunk:
+        account = accounts.get(private_key)
+        if account is None:
+            account = accounts[private_key] = Account(private_key)
+        signatures.append(account.sign_detached(message))
+    return b''.join(signatures)
+
+
+def _sign_into(buf, start, chunk):
+    offset = start * ED25519_SIGNATURE_LENGTH
+    for account, message in chunk:
+        buf[offset:offset + ED25519_SIGNATURE_LENGTH] = account.sign_detached(message)
+        offset += ED25519_SIGNATURE_LENGTH
+
+
+class BatchSigner:
+    """ detached signatures of many messages, written back to back into one buffer """
+
+    def __init__(self, max_workers=None, chunk_size=1024, processes=False):
+        self.chunk_size = chunk_size
+        self.processes = processes
+        # libsodium releases the GIL, threads are enough unless the Python side becomes the bottleneck
+        self.executor = ProcessPoolExecutor(max_workers) if processes else ThreadPoolExecutor(max_workers)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def sign(self, items):
+        """ items: [(account, message), ...], the i-th signature is buf[64 * i:64 * (i + 1)] """
+        items = list(items)
+        buf = bytearray(len(items) * ED25519_SIGNATURE_LENGTH)
+        chunks = [(start, items[start:start + self.chunk_size]) for start in range(0, len(items), self.chunk_size)]
+        # a lone chunk is signed here with the accounts already loaded, not reloaded from their keys
+        if self.processes and len(chunks) > 1:
+            results = run_chunks(self.executor, _sign_chunk, [
+                ([(account.private_key, message) for account, message in chunk],) for _, chunk in chunks
+            ])
+            for (start, _), signatures in zip(chunks, results):
+                offset = start * ED25519_SIGNATURE_LENGTH
+                buf[offset:offset + len(signatures)] = signatures
+        else:
+            run_chunks(self.executor, _sign_into, [(buf, start, chunk) for start, chunk in chunks])
+        return buf
@@ -1,10 +1,22 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 from sha3 import sha3_256
 
+from libraswap.utils.chunks import run_chunks
 from libraswap.wallet.account import Account
 
 
+def _derive_chunk(entropy, start, count):
+    # runs in a worker process, keys stay there and only the public parts come back
+    wallet = LibraWallet(entropy)
+    accounts = []
+    for index in range(start, start + count):
+        account = wallet.new_account(index)
+        accounts.append((index, account.address, account.public_key))
+    return accounts
+
+
 class LibraWallet:
     def __init__(self, entropy=None):
         if entropy is None:
@@ -17,3 +29,13 @@ class LibraWallet:
         shazer.update(self.entropy)
         shazer.update(index.to_bytes(32, "big"))
         return Account(shazer.digest().hex())
+
+    def derive_range(self, start, count, max_workers=None, chunk_size=4096):
+        """ [(index, address, public_key), ...] of the accounts start to start + count - 1 """
+        calls = [
+            (self.entropy, chunk_start, min(chunk_size, start + count - chunk_start))
+            for chunk_start in range(start, start + count, chunk_size)
+        ]
+        # worker processes are only started by the first submit
+        with ProcessPoolExecutor(max_workers) as executor:
+            return [account for chunk in run_chunks(executor, _derive_chunk, calls) for account in chunk]
@@ -7,6 +7,7 @@ Usage:
   run.py transfer_1_lib [--from=<from>] [--to=<to>]
   run.py transfer_1_eth [--depositor=<depositor>] [--deposit_id=<deposit_id>]
   run.py challenge [--from=<from>] [--from_sequence=<from_sequence>] [--deposit_id=<deposit_id>]
+  run.py follow
   run.py (-h | --help | --usage)
   run.py --version
 """
@@ -18,12 +19,18 @@ from docopt import docopt
 from web3.auto import w3
 
 from contract import deploy_contract, get_contract
-from libraswap.client import LibraClient
+from libraswap.client import LibraClient, transfer_request
+from libraswap.confirmation import ConfirmationTracker
+from libraswap.follower import LedgerFollower
+from libraswap.store import LedgerStore
 from libraswap.transaction.transaction_info import TransactionInfo
+from libraswap.utils.accumulator import AccumulatorNodeFile
 from libraswap.utils.hash import create_hasher
 from libraswap.wallet.wallet import LibraWallet
 
 ENTROPY = '129ada3066c8904cd8851a946c779534e57d309302a01b62f7f819c140345678'
+LEDGER_STORE_PATH = 'ledger.db'
+ACCUMULATOR_NODES_PATH = 'accumulator.bin'
 LIB = 1000000
 
 
@@ -38,8 +45,7 @@ def update_config(config):
 
 
 def show_balance(libra_client, lib_account1, lib_account2, eth_account1, eth_account2):
-    lib_state1 = libra_client.get_account_state(lib_account1.address)
-    lib_state2 = libra_client.get_account_state(lib_account2.address)
+    lib_state1, lib_state2 = libra_client.get_account_state_views([lib_account1.address, lib_account2.address])
     eth_balance1 = w3.fromWei(w3.eth.getBalance(eth_account1), 'ether')
     eth_balance2 = w3.fromWei(w3.eth.getBalance(eth_account2), 'ether')
 
@@ -53,7 +59,11 @@ def main():
     # command line
     arguments = docopt(__doc__, version='AMIS Libra swap 0.1')
 
-    libra = LibraClient(load_config()['RPC_SERVER'])
+    # proofs fetched once or built from followed transactions are kept locally, a challenge works even if the node is down
+    store = None
+    if arguments['follow'] or arguments['challenge'] or arguments['transfer_1_lib']:
+        store = LedgerStore(LEDGER_STORE_PATH, AccumulatorNodeFile(ACCUMULATOR_NODES_PATH))
+    libra = LibraClient(load_config()['RPC_SERVER'], store=store)
 
     # create accounts
     wallet = LibraWallet(bytes.fromhex(ENTROPY))
@@ -113,11 +123,19 @@ def main():
         if lib_state.balance == 0:
             raise Exception('Please mint some LIB to address A manually')
 
-        libra.send_transaction(from_account, to_account, 1 * LIB)
+        expiration_time = int(time.time()) + 10
+        request = transfer_request(from_account, lib_state.sequence_number, to_account, 1 * LIB, 140000, 0, expiration_time)
+        libra.submit_transaction(request, from_account)
 
         print(f"Transaction has been sent from account {arguments['--from']} with sequence {lib_state.sequence_number}\n")
 
-        time.sleep(3)
+        # continue as soon as the transfer is committed
+        with ConfirmationTracker(libra) as tracker:
+            confirmation = tracker.track(
+                from_account.address, lib_state.sequence_number, expiration_time, request.signed_txn.signed_txn
+            ).result()
+
+        print(f"Transaction has been committed at version {confirmation.version} with status {confirmation.major_status}\n")
     elif arguments['transfer_1_eth']:
         depositor_eth_address = eth_account1 if arguments['--depositor'] == 'A' else eth_account2
         deposit_id = int(arguments['--deposit_id'])
@@ -136,7 +154,15 @@ def main():
         })
     elif arguments['challenge']:
         from_lib_account = lib_account1 if arguments['--from'] == 'A' else lib_account2
-        from_sequence = int(arguments['--from_sequence'])
+        to_lib_account = lib_account2 if arguments['--from'] == 'A' else lib_account1
+        if arguments['--from_sequence'] is None:
+            # the latest followed 1 LIB transfer to the other account
+            transfers = libra.store.find_transfers(sender=from_lib_account.address, recipient=to_lib_account.address, amount=1 * LIB)
+            if not transfers:
+                raise Exception('No transfer found, please run follow or specify --from_sequence')
+            from_sequence = transfers[-1].sequence_number
+        else:
+            from_sequence = int(arguments['--from_sequence'])
         from_eth_address = eth_account1 if arguments['--from'] == 'A' else eth_account2
         deposit_id = int(arguments['--deposit_id'])
         contract_address = load_config()['LIBRA_CONTRACT_ADDRESS']
@@ -167,6 +193,12 @@ def main():
 
         tx_receipt = w3.eth.waitForTransactionReceipt(tx_hash)
         print(f"Account {arguments['--from']} challenges successfully.\n")
+    elif arguments['follow']:
+        # resume from the last followed version, the node file only grows by verified extensions stored in ledger.db
+        accumulator_nodes = store.nodes
+        follower = LedgerFollower(libra, start_version=accumulator_nodes.num_leaves, accumulator=accumulator_nodes)
+        for version, _, _, _ in follower:
+            print(f"Followed version {version}")
     show_balance(libra, lib_account1, lib_account2, eth_account1, eth_account2)
 
 